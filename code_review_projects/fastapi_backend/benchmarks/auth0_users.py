@@ -0,0 +1,112 @@
+"""
+Compares listing all the Auth0 users page by page with `stream_users`, against
+a local fake of the Auth0 management API with a fixed latency and rate limit.
+
+    python -m fastapi_backend.benchmarks.auth0_users --users 5000 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+from time import perf_counter, time
+
+from aiohttp import web
+
+from fastapi_backend.utils import auth as auth_utils
+
+
+def fake_auth0_app(users: int, latency: float, rate_limit: int) -> web.Application:
+    # at most `rate_limit` requests in flight, the rest get 429 like from Auth0
+    in_flight = 0
+
+    async def list_users(request: web.Request) -> web.Response:
+        nonlocal in_flight
+        if in_flight >= rate_limit:
+            return web.Response(
+                status=429, headers={"X-RateLimit-Reset": str(time() + latency)}
+            )
+        in_flight += 1
+        try:
+            await asyncio.sleep(latency)
+            page = int(request.query["page"])
+            per_page = int(request.query["per_page"])
+            start = page * per_page
+            end = min(start + per_page, users)
+            return web.json_response(
+                {
+                    "start": start,
+                    "limit": per_page,
+                    "length": max(end - start, 0),
+                    "total": users,
+                    "users": [
+                        {"user_id": f"auth0|{i}", "email": f"user{i}@example.com"}
+                        for i in range(start, end)
+                    ],
+                }
+            )
+        finally:
+            in_flight -= 1
+
+    app = web.Application()
+    app.router.add_get("/api/v2/users", list_users)
+    return app
+
+
+async def list_serially(per_page: int) -> int:
+    # the same as `list_users(_all=True)`, one page after another
+    semaphore = asyncio.Semaphore(1)
+    count = 0
+    page = 0
+    while True:
+        result = await auth_utils._fetch_users_page(
+            page, per_page, None, "token", semaphore, max_retries=5
+        )
+        count += result["length"]
+        if count >= result["total"]:
+            return count
+        page += 1
+
+
+async def list_concurrently(per_page: int, concurrency: int) -> int:
+    count = 0
+    async for _ in auth_utils.stream_users(
+        None, per_page=per_page, concurrency=concurrency
+    ):
+        count += 1
+    return count
+
+
+async def main(args: argparse.Namespace):
+    runner = web.AppRunner(fake_auth0_app(args.users, args.latency, args.rate_limit))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    auth_utils.AUTH_MANAGEMENT_API_URL = f"http://127.0.0.1:{args.port}/api/v2"
+    auth_utils.get_management_token = lambda: "token"
+
+    results = {}
+    try:
+        for name, run in (
+            ("serial", lambda: list_serially(args.per_page)),
+            ("stream_users", lambda: list_concurrently(args.per_page, args.concurrency)),
+        ):
+            start = perf_counter()
+            users = await run()
+            results[name] = {"users": users, "seconds": round(perf_counter() - start, 3)}
+    finally:
+        session = await auth_utils.get_session()
+        await session.close()
+        await runner.cleanup()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--rate-limit", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Authenticated requests per second of M2M traffic, with the decoded tokens
+cached by `authenticate` and with every token decoded again.
+
+    python -m fastapi_backend.benchmarks.m2m_auth --requests 5000
+"""
+import argparse
+import asyncio
+import json
+from time import perf_counter, time
+
+from fastapi import Depends, FastAPI
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, SecurityScopes
+from fastapi.testclient import TestClient
+from fastapi_auth0 import Auth0User
+from jose import jwt
+
+from fastapi_backend.utils import auth as auth_utils
+
+
+async def decode_every_time(
+    creds: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+) -> Auth0User:
+    # what `authenticate` did for the M2M tokens before the cache
+    token = creds.credentials
+    if jwt.get_unverified_claims(token)["iss"] != auth_utils.settings.m2m_token_issuer:
+        raise ValueError("Unknown issuer")
+    payload = jwt.decode(
+        token, auth_utils.settings.m2m_token_secret, options={"verify_aud": False}
+    )
+    return Auth0User(**payload)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/cached")
+    async def cached(user: Auth0User = Depends(auth_utils.authenticate)):
+        return {"id": user.id}
+
+    @app.post("/uncached")
+    async def uncached(user: Auth0User = Depends(decode_every_time)):
+        return {"id": user.id}
+
+    return app
+
+
+def requests_per_second(client: TestClient, path: str, token: str, requests: int) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    start = perf_counter()
+    for _ in range(requests):
+        response = client.post(path, headers=headers)
+        response.raise_for_status()
+    return round(requests / (perf_counter() - start), 1)
+
+
+async def calls_per_second(dependency, token: str, calls: int) -> float:
+    # the auth alone, without the HTTP overhead of the test client
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    start = perf_counter()
+    for _ in range(calls):
+        if dependency is auth_utils.authenticate:
+            await dependency(SecurityScopes(), creds)
+        else:
+            await dependency(creds)
+    return round(calls / (perf_counter() - start), 1)
+
+
+def main(args: argparse.Namespace):
+    token = jwt.encode(
+        {
+            "sub": "service@clients",
+            "iss": auth_utils.settings.m2m_token_issuer,
+            "exp": int(time()) + 3600,
+            "permissions": ["campaign:stop"],
+        },
+        auth_utils.settings.m2m_token_secret,
+    )
+    client = TestClient(make_app())
+    results = {
+        path: requests_per_second(client, f"/{path}", token, args.requests)
+        for path in ("uncached", "cached")
+    }
+    calls = {
+        name: asyncio.run(calls_per_second(dependency, token, args.requests))
+        for name, dependency in (
+            ("uncached", decode_every_time),
+            ("cached", auth_utils.authenticate),
+        )
+    }
+    print(
+        json.dumps(
+            {"requests_per_second": results, "auth_calls_per_second": calls},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    main(parser.parse_args())
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os.path
 import tempfile
 from datetime import datetime
@@ -8,9 +10,10 @@ from external_services.campaign_metadata import CampaignMetadataRepository
 from external_services.report import CampaignReportRepository
 from fastapi import APIRouter, Depends, Header, Response, Security
 from fastapi import status as http_status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_auth0 import Auth0User
 from mythx_models.response.detected_issues import IssueReport
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 
 from fastapi_backend.config import ApplicationSettings
@@ -22,11 +25,16 @@ from fastapi_backend.repository import (
 from fastapi_backend.repository.exceptions import DBError
 from fastapi_backend.schema import (
     Campaign,
+    CampaignBatchItem,
+    CampaignBatchRequest,
+    CampaignBatchResponse,
     CampaignResponse,
     CampaignStatus,
+    CampaignSubmission,
     CampaignUpdateInput,
     PaginatedResponse,
     PaginationParams,
+    ReportInput,
 
 )
 from fastapi_backend.utils.auth import (
@@ -41,23 +49,51 @@ from fastapi_backend.utils.cache import ETag, cache_headers
 from fastapi_backend.utils.campaign import process_request, read_body, select_encoding
 from fastapi_backend.utils.exceptions import HTTPException
 from fastapi_backend.utils.id import generate_uid
+from fastapi_backend.utils.idempotency import (
+    IdempotencyKeyReusedError,
+    IdempotencyStore,
+)
+from fastapi_backend.utils.jobs import Job, JobQueue
+from fastapi_backend.utils.notifications import campaign_events
+from fastapi_backend.utils.rate_limiter import (
+    RateLimiterResult,
+    SubmissionRateLimit,
+    SubmissionReplayRateLimit,
+    get_client_ip_address,
+)
+from fastapi_backend.utils.report_buffer import report_buffer
+from fastapi_backend.utils.response import ORJSONModelResponse
 from fastapi_backend.utils.stream import process
 
 router = APIRouter()
 
 settings = ApplicationSettings()
 
+# post-submission work of the asynchronous campaign submissions
+campaign_jobs = JobQueue()
+# the submissions which were already accepted with 202 are finished before exiting
+router.add_event_handler("shutdown", campaign_jobs.stop)
+# the buffered reports are written before exiting
+router.add_event_handler("shutdown", report_buffer.stop)
+# outcomes of the submissions with the `Idempotency-Key` header
+campaign_submissions = IdempotencyStore(ttl=3600)
+
+SSE_KEEPALIVE_INTERVAL = 15
+
 
 @router.post(
     "/",
     response_model=Campaign,
     response_model_exclude_none=True,
     response_model_by_alias=True,
+    responses={http_status.HTTP_202_ACCEPTED: {"model": CampaignSubmission}},
 )
 async def create_campaign(
     request: Request,
     start_immediately: bool = True,
+    asynchronous: bool = False,
     user: Auth0User = Security(AnonymousUserAuth),
+    idempotency_key: Optional[str] = Header(None),
 ):
     if not settings.feature_anonymous_campaign_submissions and is_anonymous_user(user):
         raise HTTPException(
@@ -65,6 +101,37 @@ async def create_campaign(
             detail="Authentication required",
         )
 
+    if idempotency_key:
+        idempotency_key = f"{__submission_owner(request, user)}:{idempotency_key}"
+
+    # the replays of a stored submission are answered from the store, so they don't
+    # count against the submission limit, only against the (higher) replay limit.
+    # Both are checked before the body is read, so the rejected submissions never
+    # hit the disk
+    submission_ticket = None
+    if idempotency_key and campaign_submissions.stored(idempotency_key):
+        await SubmissionReplayRateLimit(request, user)
+    else:
+        submission_ticket = await SubmissionRateLimit(request, user)
+
+    return await __create_campaign(
+        request,
+        start_immediately,
+        asynchronous,
+        user,
+        submission_ticket,
+        idempotency_key,
+    )
+
+
+async def __create_campaign(
+    request: Request,
+    start_immediately: bool,
+    asynchronous: bool,
+    user: Auth0User,
+    submission_ticket: Optional[RateLimiterResult],
+    idempotency_key: Optional[str] = None,
+) -> Union[Campaign, Response]:
     client_ip_address = request.headers.get("X-Forwarded-For", None)
 
     campaign_id = generate_uid("cmp")
@@ -72,9 +139,101 @@ async def create_campaign(
     temp_dir = tempfile.TemporaryDirectory()
     file_path = f"{temp_dir.name}/campaign_{campaign_id}.json"
 
+    job_attempted = False
+
+    async def run_job() -> Campaign:
+        nonlocal job_attempted
+        retry, job_attempted = job_attempted, True
+        return await __submit_campaign(
+            campaign_id,
+            user,
+            file_path,
+            client_ip_address,
+            start_immediately,
+            submission_ticket,
+            retry=retry,
+        )
+
+    async def accept_campaign() -> Union[Campaign, Response]:
+        nonlocal submission_ticket
+        if submission_ticket is None:
+            # the stored outcome of the replayed submission has expired meanwhile
+            submission_ticket = await SubmissionRateLimit(request, user)
+        if asynchronous:
+            # the temp dir is cleaned up by the job when it's done
+            job = campaign_jobs.submit(
+                campaign_id,
+                run_job,
+                on_finish=temp_dir.cleanup,
+                owner=__submission_owner(request, user),
+            )
+            return JSONResponse(
+                status_code=http_status.HTTP_202_ACCEPTED,
+                content=__campaign_submission(request, job).dict(by_alias=True),
+            )
+
+        return await __submit_campaign(
+            campaign_id,
+            user,
+            file_path,
+            client_ip_address,
+            start_immediately,
+            submission_ticket,
+            save_body_on_error=False,
+        )
+
     try:
-        await process_request(file_path, request)
+        body_hash = await process_request(file_path, request)
+        if idempotency_key:
+            return await campaign_submissions.run(
+                idempotency_key, body_hash, accept_campaign
+            )
+        return await accept_campaign()
+    except IdempotencyKeyReusedError:
+        if submission_ticket is None:
+            # a replay with a different body isn't exempt from the submission limit
+            await SubmissionRateLimit(request, user)
+        raise
+    except Exception as e:
+        if (
+            os.path.exists(file_path)
+            and not isinstance(e, HTTPException)
+            and not isinstance(e, DBError)
+        ):
+            await CampaignMetadataRepository.get_instance().save_metadata(
+                campaign_id, "body", json_stream=read_body(file_path)
+            )
+        if isinstance(e, ValueError):
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail=f"There was an error parsing the payload: {str(e)}",
+            ) from e
+        raise
+    finally:
+        # unless a job was submitted for this campaign, then the job owns the temp dir
+        if campaign_jobs.get(campaign_id) is None:
+            temp_dir.cleanup()
 
+
+async def __submit_campaign(
+    campaign_id: str,
+    user: Auth0User,
+    file_path: str,
+    client_ip_address: Optional[str],
+    start_immediately: bool,
+    submission_ticket: Optional[RateLimiterResult] = None,
+    save_body_on_error: bool = True,
+    retry: bool = False,
+) -> Campaign:
+    try:
+        # a previous attempt of the job has created the campaign, but `process()`
+        # writes its parameters and inputs afterwards, and they may be missing, so
+        # the job fails (HTTPException isn't retried) instead of starting it
+        if retry and CampaignRepository.exists(campaign_id):
+            raise HTTPException(
+                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="The campaign was partially created by a failed attempt",
+            )
         with open(file_path, "r") as f:
             campaign, params = await process(
                 campaign_id,
@@ -85,36 +244,65 @@ async def create_campaign(
                 only_default_project=True if is_anonymous_user(user) else False,
             )
 
-            if is_anonymous_user(user):
-                campaign = __share_campaign(campaign_id)
-
-            return (
-                await __start_campaign(
-                    campaign_id,
-                    user,
-                    params,
-                    client_ip_address,
-                )
-                if start_immediately
-                else campaign
+        if is_anonymous_user(user):
+            campaign = __share_campaign(campaign_id)
+
+        return (
+            await __start_campaign(
+                campaign_id,
+                user,
+                submission_ticket,
             )
+            if start_immediately
+            else campaign
+        )
     except Exception as e:
         if (
-            os.path.exists(file_path)
+            save_body_on_error
+            and os.path.exists(file_path)
             and not isinstance(e, HTTPException)
             and not isinstance(e, DBError)
         ):
             await CampaignMetadataRepository.get_instance().save_metadata(
                 campaign_id, "body", json_stream=read_body(file_path)
             )
-        if isinstance(e, ValueError):
-            raise HTTPException(
-                status_code=http_status.HTTP_400_BAD_REQUEST,
-                detail=f"There was an error parsing the payload: {str(e)}",
-            ) from e
         raise
-    finally:
-        temp_dir.cleanup()
+
+
+def __submission_owner(request: Request, user: Auth0User) -> str:
+    # anonymous users share the id, so their submissions are told apart by the IP address
+    if is_anonymous_user(user):
+        return f"{user.id}:{get_client_ip_address(request)}"
+    return user.id
+
+
+def __campaign_submission(request: Request, job: Job) -> CampaignSubmission:
+    return CampaignSubmission(
+        id=job.id,
+        status=job.status.value,
+        attempts=job.attempts,
+        error=job.error,
+        status_url=str(request.url_for("get_campaign_submission", campaign_id=job.id)),
+    )
+
+
+@router.get(
+    "/{campaign_id}/submission",
+    response_model=CampaignSubmission,
+    response_model_exclude_none=True,
+    response_model_by_alias=True,
+)
+async def get_campaign_submission(
+    campaign_id: str,
+    request: Request,
+    user: Auth0User = Security(AnonymousUserAuth),
+) -> CampaignSubmission:
+    job = campaign_jobs.get(campaign_id, owner=__submission_owner(request, user))
+    if job is None:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND, detail="Submission not found"
+        )
+    return __campaign_submission(request, job)
 
 
 @router.get(
@@ -128,13 +316,15 @@ def list_campaigns(
     status: Optional[CampaignStatus] = None,
     project: Optional[str] = None,
     user: Auth0User = Security(auth.get_user),
-) -> PaginatedResponse[CampaignResponse]:
+) -> Response:
     campaigns = CompositeRepository.list_full_campaigns(
         params, project, owner=user.id, status=status
     )
-    return PaginatedResponse.construct(
-        items=campaigns.items,
-        total=campaigns.total,
+    return ORJSONModelResponse(
+        PaginatedResponse.construct(
+            items=campaigns.items,
+            total=campaigns.total,
+        )
     )
 
 
@@ -146,10 +336,9 @@ def list_campaigns(
 )
 def get_campaign(
     campaign_id: str,
-    response: Response,
     user: Optional[Auth0User] = Security(OptionalAuth),
     etags: List[str] = Depends(ETag()),
-) -> Union[Response, CampaignResponse]:
+) -> Response:
     if not user:
         campaign_exists = CampaignRepository.exists(campaign_id, public=True)
     else:
@@ -167,8 +356,78 @@ def get_campaign(
             headers=cache_headers(campaign_hash),
         )
 
-    response.headers.update(cache_headers(campaign_hash))
-    return CompositeRepository.get_full_campaign(campaign_id)
+    return ORJSONModelResponse(
+        CompositeRepository.get_full_campaign(campaign_id),
+        headers=cache_headers(campaign_hash),
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=CampaignBatchResponse,
+    response_model_exclude_none=True,
+    response_model_by_alias=True,
+)
+def get_campaigns_batch(
+    batch: CampaignBatchRequest,
+    user: Optional[Auth0User] = Security(OptionalAuth),
+) -> Response:
+    items, not_modified = CompositeRepository.get_full_campaigns(
+        batch.ids,
+        owner=user.id if user else None,
+        public=None if user else True,
+        etags=batch.etags,
+    )
+    return ORJSONModelResponse(
+        CampaignBatchResponse.construct(
+            items=[
+                CampaignBatchItem.construct(etag=etag, campaign=campaign)
+                for etag, campaign in items
+            ],
+            not_modified=not_modified,
+        )
+    )
+
+
+@router.get("/{campaign_id}/events")
+async def get_campaign_events(
+    campaign_id: str,
+    request: Request,
+    user: Optional[Auth0User] = Security(OptionalAuth),
+):
+    if not user:
+        campaign_exists = CampaignRepository.exists(campaign_id, public=True)
+    else:
+        campaign_exists = CampaignRepository.exists(campaign_id, owner=user.id)
+    if not campaign_exists:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND, detail="Campaign not found"
+        )
+
+    async def stream():
+        # subscribed before the current state is read, so no change is missed in between
+        events = campaign_events.subscribe(campaign_id)
+        try:
+            campaign_hash = await run_in_threadpool(CampaignRepository.hash, campaign_id)
+            yield f"event: hash\ndata: {json.dumps(campaign_hash)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        events.get(), timeout=SSE_KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    # keeps the proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            campaign_events.unsubscribe(campaign_id, events)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
@@ -337,6 +596,24 @@ async def stop_campaign(
     )
 
 
+@router.put("/{campaign_id}/report", status_code=http_status.HTTP_202_ACCEPTED)
+async def report_campaign(
+    campaign_id: str,
+    report: ReportInput,
+    user: Auth0User = Security(authenticate),
+) -> Response:
+    if user.id[-8:] != "@clients" or (  # M2M Client
+        not user.permissions or "campaign:report" not in user.permissions
+    ):
+        raise HTTPException(
+            status_code=http_status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions to report campaign",
+        )
+    # the reports are written in batches, only the newest one of a campaign is kept
+    report_buffer.add(campaign_id, report)
+    return Response(status_code=http_status.HTTP_202_ACCEPTED)
+
+
 def __share_campaign(campaign_id: str) -> Campaign:
     return CampaignRepository.update(campaign_id, CampaignUpdateInput(public=True))
 
@@ -7,8 +7,15 @@ from .functions import (
     freeze_time,
     unfreeze_time,
 )
-from .miscellaneous import FreezeTimeParams, FreezeTimeParamType
+from .miscellaneous import CampaignNameSequence, FreezeTimeParams, FreezeTimeParamType
 from .report import Report as ReportModel
+from .triggers import (
+    __campaign_insert_activity_trigger__,
+    __campaign_status_activity__,
+    __campaign_status_activity_trigger__,
+    __report_activity__,
+    __report_activity_trigger__,
+)
 from .views import (
     CampaignAggregatedView,
     CustomersWithLimitsView,
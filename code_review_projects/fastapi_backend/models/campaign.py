@@ -6,12 +6,14 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import text
 
 from fastapi_backend.schema.campaign import CampaignStatus
 
@@ -20,9 +22,41 @@ from .base import Base
 
 class Campaign(Base):
     __tablename__ = "campaign"
-    __table_args__ = (UniqueConstraint("owner", "owner_ip_address", "name"),)
-    id = Column(String, primary_key=True, index=True)
-    owner = Column(String, nullable=False, index=True)
+    __table_args__ = (
+        UniqueConstraint("owner", "owner_ip_address", "name"),
+        # CampaignRepository.list, CompositeRepository.list_full_campaigns
+        Index(
+            "ix_campaign_owner_submitted_at",
+            "owner",
+            text("submitted_at DESC"),
+            postgresql_where=text("deleted = false"),
+        ),
+        Index(
+            "ix_campaign_owner_project_submitted_at",
+            "owner",
+            "project",
+            text("submitted_at DESC"),
+            postgresql_where=text("deleted = false"),
+        ),
+        # CampaignRepository.count (deleted campaigns are counted too)
+        Index("ix_campaign_owner_status", "owner", "status"),
+        # campaign_aggregated_view, owner_aggregated_view, consumed_by_customer()
+        # and owner_limits_view (status = 'RUNNING' implies the index predicate)
+        Index(
+            "ix_campaign_active_owner_started_at",
+            "owner",
+            "started_at",
+            postgresql_where=text("status IN ('RUNNING', 'STOPPED')"),
+        ),
+        # CompositeRepository.get_stalled_campaigns
+        Index(
+            "ix_campaign_running_last_activity_at",
+            "last_activity_at",
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+    id = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
     name = Column(String, nullable=False, index=True)
     project = Column(String, ForeignKey("project.id"), index=True)
     num_sources = Column(Integer, nullable=False)
@@ -32,22 +66,24 @@ class Campaign(Base):
     )
     instrumentation_metadata = Column(Text, nullable=True)
     map_to_original_source = Column(Boolean, nullable=True)
-    status = Column(Enum(CampaignStatus), nullable=False, index=True)
+    status = Column(Enum(CampaignStatus), nullable=False)
     submitted_at = Column(
         DateTime, default=lambda x: datetime.now(), nullable=False, index=True
     )
     started_at = Column(DateTime, index=True)
     stopped_at = Column(DateTime, index=True)
     error = Column(String)
-    deleted = Column(Boolean, default=False, index=True)
-    public = Column(Boolean, default=False, index=True)
+    deleted = Column(Boolean, default=False)
+    public = Column(Boolean, default=False)
     lock = Column(Boolean, nullable=False, default=False, index=True)
     postprocessor_error_count = Column(Integer, nullable=False, default=0)
     postprocessor_last_run_start = Column(
         DateTime, default=lambda x: datetime.now(), nullable=False, index=True
     )
-    quick_check = Column(Boolean, default=False, nullable=False, index=True)
+    quick_check = Column(Boolean, default=False, nullable=False)
     foundry_tests = Column(Boolean, default=False)
     foundry_tests_list = Column(String)
     report_usage = Column(Boolean, default=False)
     owner_ip_address = Column(String, index=True)
+    # maintained by the triggers in models/triggers.py
+    last_activity_at = Column(DateTime)
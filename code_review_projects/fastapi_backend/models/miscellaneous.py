@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, String
+from sqlalchemy import BigInteger, Column, ForeignKey, String
 from sqlalchemy.dialects.postgresql import JSONB
 
 from fastapi_backend.models import Base
@@ -15,3 +15,9 @@ class FreezeTimeParams(Base):
         String, ForeignKey("freeze_time_param_type.param_type"), primary_key=True
     )
     value = Column(JSONB)
+
+
+class CampaignNameSequence(Base):
+    __tablename__ = "campaign_name_sequence"
+    owner = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
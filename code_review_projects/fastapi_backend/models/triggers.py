@@ -0,0 +1,69 @@
+from alembic_utils.pg_function import PGFunction
+from alembic_utils.pg_trigger import PGTrigger
+
+# `campaign.last_activity_at` is the time of the last report or status change,
+# it's maintained by triggers, so it's correct for every writer of the tables
+
+__campaign_status_activity__ = PGFunction(
+    schema="public",
+    signature="campaign_status_activity()",
+    definition="""
+    RETURNS trigger AS
+    $$
+    BEGIN
+        NEW.last_activity_at = freezable_now()::timestamp;
+        RETURN NEW;
+    END
+    $$ language plpgsql;
+    """,
+)
+
+__report_activity__ = PGFunction(
+    schema="public",
+    signature="report_activity()",
+    definition="""
+    RETURNS trigger AS
+    $$
+    BEGIN
+        UPDATE campaign SET last_activity_at = NEW.issued_at
+        WHERE id = NEW.campaign_id
+        AND (last_activity_at IS NULL OR last_activity_at < NEW.issued_at);
+        RETURN NULL;
+    END
+    $$ language plpgsql;
+    """,
+)
+
+__campaign_insert_activity_trigger__ = PGTrigger(
+    schema="public",
+    signature="campaign_insert_activity",
+    on_entity="public.campaign",
+    definition="""
+    BEFORE INSERT ON public.campaign
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.campaign_status_activity()
+    """,
+)
+
+__campaign_status_activity_trigger__ = PGTrigger(
+    schema="public",
+    signature="campaign_status_activity",
+    on_entity="public.campaign",
+    definition="""
+    BEFORE UPDATE OF status ON public.campaign
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE PROCEDURE public.campaign_status_activity()
+    """,
+)
+
+__report_activity_trigger__ = PGTrigger(
+    schema="public",
+    signature="report_activity",
+    on_entity="public.report",
+    definition="""
+    AFTER INSERT OR UPDATE OF issued_at ON public.report
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.report_activity()
+    """,
+)
@@ -1,12 +1,14 @@
 import hashlib
 import json
+from datetime import datetime
 from typing import List, Optional, Union
 
 from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Query, Session
 from ujson import encode
 
-from fastapi_backend.models import CampaignModel, ReportModel
+from fastapi_backend.models import CampaignModel, CampaignNameSequence, ReportModel
 from fastapi_backend.schema import (
     Campaign,
     CampaignBase,
@@ -16,6 +18,7 @@ from fastapi_backend.schema import (
     PaginationParams,
 )
 from fastapi_backend.utils.id import generate_uid
+from fastapi_backend.utils.notifications import notify_campaign_event
 
 from .db import Session as DBSession
 from .db import WrongQueryError
@@ -34,6 +37,11 @@ def get_name(*args, **kwargs):
     return "name is already used in another campaign"
 
 
+def campaign_hash(status: CampaignStatus, issued_at: Optional[datetime]) -> str:
+    result = [status, issued_at.isoformat() if issued_at is not None else None]
+    return hashlib.sha1(json.dumps(result).encode("utf-8")).hexdigest()
+
+
 class CampaignRepository:
     running_campaigns = [CampaignStatus.RUNNING, CampaignStatus.STARTING]
     all_campaigns_without_error = [
@@ -94,6 +102,13 @@ class CampaignRepository:
             updated_fields = campaign_update.dict(exclude_unset=True)
             for field, value in updated_fields.items():
                 setattr(campaign, field, value)
+            if "status" in updated_fields:
+                notify_campaign_event(
+                    db,
+                    campaign_id,
+                    "status",
+                    status=CampaignStatus(campaign_update.status).value,
+                )
             db.commit()
             return Campaign.from_orm(campaign)
 
@@ -223,6 +238,24 @@ class CampaignRepository:
                 query = query.filter(CampaignModel.owner_ip_address == owner_ip_address)
             return query.count()
 
+    @staticmethod
+    @handle_db_exceptions()
+    def next_name_number(owner: str) -> int:
+        # the row lock taken by the upsert serializes concurrent submissions of the same owner
+        stmt = (
+            insert(CampaignNameSequence)
+            .values(owner=owner, value=1)
+            .on_conflict_do_update(
+                index_elements=[CampaignNameSequence.owner],
+                set_={"value": CampaignNameSequence.value + 1},
+            )
+            .returning(CampaignNameSequence.value)
+        )
+        with DBSession() as db:  # type: Session
+            value = db.execute(stmt).scalar_one()
+            db.commit()
+            return value
+
     @staticmethod
     @handle_db_exceptions()
     def hash(campaign_id: str):
@@ -235,7 +268,4 @@ class CampaignRepository:
             _res = query.one_or_none()
             if _res is None:
                 return None
-            result = list(_res)
-            if result[1] is not None:
-                result[1] = result[1].isoformat()
-            return hashlib.sha1(json.dumps(result).encode("utf-8")).hexdigest()
+            return campaign_hash(*_res)
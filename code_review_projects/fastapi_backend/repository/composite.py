@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
 
 from mythx_models.response import VulnerabilityStatistics
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from sqlalchemy.sql.functions import coalesce
 
 from fastapi_backend.models import CampaignModel, FullCampaignView, ReportModel
 
@@ -14,6 +14,7 @@ from ..schema import (
     PaginatedResult,
     PaginationParams,
 )
+from .campaign import campaign_hash
 from .db import Session as DBSession
 from .exceptions import handle_db_exceptions
 
@@ -64,6 +65,45 @@ class CompositeRepository:
                 return None
             return cls.construct_campaign_response(campaign)
 
+    @classmethod
+    @handle_db_exceptions()
+    def get_full_campaigns(
+        cls,
+        campaign_ids: list[str],
+        owner: str | None = None,
+        public: bool | None = None,
+        etags: dict[str, str] | None = None,
+    ) -> tuple[list[tuple[str, CampaignResponse]], list[str]]:
+        """
+        Returns the accessible campaigns with their ETags, leaving out the campaigns
+        whose ETag is in `etags` (they are returned as not modified ids instead).
+        """
+        etags = etags or {}
+        with DBSession() as db:  # type: Session
+            query = (
+                db.query(FullCampaignView, ReportModel.issued_at)
+                .outerjoin(ReportModel, ReportModel.campaign_id == FullCampaignView.id)
+                .filter(
+                    FullCampaignView.id.in_(campaign_ids),
+                    FullCampaignView.deleted == False,
+                )
+            )
+            if owner:
+                query = query.filter(
+                    or_(FullCampaignView.owner == owner, FullCampaignView.public == True)
+                )
+            if public is not None:
+                query = query.filter(FullCampaignView.public == public)
+
+            items, not_modified = [], []
+            for campaign, issued_at in query:
+                etag = campaign_hash(CampaignStatus(campaign.status.lower()), issued_at)
+                if etags.get(campaign.id) == etag:
+                    not_modified.append(campaign.id)
+                    continue
+                items.append((etag, cls.construct_campaign_response(campaign)))
+            return items, not_modified
+
     @classmethod
     @handle_db_exceptions()
     def list_full_campaigns(
@@ -102,13 +142,21 @@ class CompositeRepository:
     @handle_db_exceptions()
     def get_stalled_campaigns(report_timeout: int) -> list[str]:
         with DBSession() as db:
+            stalled_before = datetime.utcnow() - timedelta(seconds=report_timeout)
+            # both branches are range scans on ix_campaign_running_last_activity_at,
+            # the campaigns which were running before the column existed have no
+            # activity until their next report or status change
             stalled_campaign_ids = (
                 db.query(CampaignModel.id)
-                .outerjoin(ReportModel, CampaignModel.id == ReportModel.campaign_id)
                 .filter(
                     CampaignModel.status == CampaignStatus.RUNNING.name,
-                    coalesce(ReportModel.issued_at, CampaignModel.started_at)
-                    < (datetime.utcnow() - timedelta(seconds=report_timeout)),
+                    or_(
+                        CampaignModel.last_activity_at < stalled_before,
+                        and_(
+                            CampaignModel.last_activity_at.is_(None),
+                            CampaignModel.started_at < stalled_before,
+                        ),
+                    ),
                 )
                 .all()
             )
@@ -1,12 +1,17 @@
 import hashlib
 import json
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from mythx_models.response import VulnerabilityStatistics
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from fastapi_backend.models import ReportModel
 from fastapi_backend.schema import CampaignReportedMetrics, Report, ReportInput
+from fastapi_backend.utils.notifications import (
+    notify_campaign_event,
+    notify_campaign_events,
+)
 
 from .db import Session as DBSession
 from .exceptions import handle_db_exceptions
@@ -27,6 +32,9 @@ class ReportRepository:
         )
         with DBSession() as db:  # type: Session
             db.add(report)
+            notify_campaign_event(
+                db, campaign_id, "report", issued_at=report_input.issued_at.isoformat()
+            )
             db.commit()
             return Report(
                 id=report.id,
@@ -56,6 +64,9 @@ class ReportRepository:
             report.vulnerabilities_none = report_update.vulnerability_statistics.none
             report.issued_at = report_update.issued_at
             report.run_time = report_update.run_time
+            notify_campaign_event(
+                db, campaign_id, "report", issued_at=report_update.issued_at.isoformat()
+            )
             db.commit()
             return Report(
                 id=report.id,
@@ -70,6 +81,105 @@ class ReportRepository:
                 run_time=report.run_time,
             )
 
+    @staticmethod
+    def _upsert_statement(reports: List[Tuple[str, ReportInput]]):
+        stmt = insert(ReportModel).values(
+            [
+                {
+                    "campaign_id": campaign_id,
+                    "vulnerabilities_high": report.vulnerability_statistics.high,
+                    "vulnerabilities_medium": report.vulnerability_statistics.medium,
+                    "vulnerabilities_low": report.vulnerability_statistics.low,
+                    "vulnerabilities_none": report.vulnerability_statistics.none,
+                    "issued_at": report.issued_at,
+                    "run_time": report.run_time,
+                }
+                for campaign_id, report in reports
+            ]
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[ReportModel.campaign_id],
+            # the reports can arrive out of order, an older one never overwrites a newer one
+            where=ReportModel.issued_at <= stmt.excluded.issued_at,
+            set_={
+                "vulnerabilities_high": stmt.excluded.vulnerabilities_high,
+                "vulnerabilities_medium": stmt.excluded.vulnerabilities_medium,
+                "vulnerabilities_low": stmt.excluded.vulnerabilities_low,
+                "vulnerabilities_none": stmt.excluded.vulnerabilities_none,
+                "issued_at": stmt.excluded.issued_at,
+                "run_time": stmt.excluded.run_time,
+            },
+        ).returning(
+            ReportModel.id,
+            ReportModel.campaign_id,
+            ReportModel.vulnerabilities_high,
+            ReportModel.vulnerabilities_medium,
+            ReportModel.vulnerabilities_low,
+            ReportModel.vulnerabilities_none,
+            ReportModel.issued_at,
+            ReportModel.run_time,
+        )
+
+    @staticmethod
+    def _report_from_row(row) -> Report:
+        return Report(
+            id=row.id,
+            campaign_id=row.campaign_id,
+            vulnerability_statistics=VulnerabilityStatistics(
+                high=row.vulnerabilities_high,
+                medium=row.vulnerabilities_medium,
+                low=row.vulnerabilities_low,
+                none=row.vulnerabilities_none,
+            ),
+            issued_at=row.issued_at,
+            run_time=row.run_time,
+        )
+
+    @classmethod
+    @handle_db_exceptions()
+    def save(cls, campaign_id: str, report_input: ReportInput) -> Optional[Report]:
+        """
+        Creates or updates the report of the campaign in one statement.
+        Returns `None` if the stored report is newer.
+        """
+        with DBSession() as db:  # type: Session
+            row = db.execute(
+                cls._upsert_statement([(campaign_id, report_input)])
+            ).one_or_none()
+            if row is None:
+                return None
+            notify_campaign_event(
+                db, campaign_id, "report", issued_at=report_input.issued_at.isoformat()
+            )
+            db.commit()
+            return cls._report_from_row(row)
+
+    @classmethod
+    @handle_db_exceptions()
+    def save_bulk(cls, reports: List[Tuple[str, ReportInput]]) -> List[Report]:
+        """
+        Creates or updates the reports of many campaigns in one statement.
+        A campaign can only appear once in `reports`. The reports which are
+        older than the stored ones are skipped and not returned.
+        """
+        if not reports:
+            return []
+        with DBSession() as db:  # type: Session
+            rows = db.execute(cls._upsert_statement(reports)).all()
+            notify_campaign_events(
+                db,
+                [
+                    {
+                        "campaign_id": row.campaign_id,
+                        "event": "report",
+                        "issued_at": row.issued_at.isoformat(),
+                    }
+                    for row in rows
+                ],
+            )
+            db.commit()
+            return [cls._report_from_row(row) for row in rows]
+
     @staticmethod
     @handle_db_exceptions()
     def delete(campaign_id: str) -> None:
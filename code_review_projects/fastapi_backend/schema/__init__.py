@@ -3,11 +3,15 @@ from .analytics import CrashReport, Session
 from .campaign import (
     Campaign,
     CampaignBase,
+    CampaignBatchItem,
+    CampaignBatchRequest,
+    CampaignBatchResponse,
     CampaignCorpus,
     CampaignProject,
     CampaignRawResponse,
     CampaignResponse,
     CampaignStatus,
+    CampaignSubmission,
     CampaignUpdateInput,
     CampaignUpdateRequest,
     CampaignWithEmail,
@@ -213,6 +213,38 @@ class CampaignUpdateInput(CampaignUpdateRequest):
         allow_population_by_field_name = True
 
 
+class CampaignBatchRequest(BaseModel):
+    ids: List[str] = Field(max_items=100)
+    etags: Dict[str, str] = Field(
+        default_factory=dict,
+        description="ETags of the campaigns already known by the client, by campaign id",
+    )
+
+
+class CampaignBatchItem(BaseModel):
+    etag: str
+    campaign: CampaignResponse
+
+
+class CampaignBatchResponse(BaseModel):
+    items: List[CampaignBatchItem]
+    not_modified: List[str] = Field(alias="notModified")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class CampaignSubmission(BaseModel):
+    id: str
+    status: str
+    attempts: int = 0
+    error: Optional[Any]
+    status_url: Optional[str] = Field(alias="statusUrl")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
 class CampaignRawResponse(BaseModel):
     instrumentation_metadata: Optional[Any] = Field(alias="instrumentationMetadata")
     map_to_original_source: Optional[bool] = Field(alias="mapToOriginalSource")
@@ -1,6 +1,9 @@
+import asyncio
+import hashlib
 import logging
+import random
 from time import time
-from typing import Dict, List, Optional, Tuple, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
 from auth0.v3.authentication import GetToken
 from auth0.v3.authentication.revoke_token import RevokeToken
@@ -10,9 +13,12 @@ from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, SecurityScopes
 from fastapi_auth0 import Auth0, Auth0User
 from jose import jwt
+from starlette.concurrency import run_in_threadpool
 
 from fastapi_backend.config import ApplicationSettings
 from fastapi_backend.schema import Auth0UsersList
+from fastapi_backend.utils.cache import TTLCache
+from fastapi_backend.utils.http_session import get_session
 
 settings = ApplicationSettings()
 auth = Auth0(domain=settings.auth_domain, api_audience=settings.auth_audience)
@@ -20,6 +26,17 @@ auth = Auth0(domain=settings.auth_domain, api_audience=settings.auth_audience)
 __management_token: Optional[str] = None
 __management_token_expire_date: Optional[int] = None
 AUTH_DOMAIN_FULL = f"https://{settings.auth_domain}/"
+AUTH_MANAGEMENT_API_URL = f"https://{settings.auth_domain}/api/v2"
+
+# verified users are cached until the token expires, but no longer than this
+VERIFIED_TOKEN_TTL = 300
+JWKS_REFRESH_INTERVAL = 3600
+
+_verified_tokens: TTLCache[Auth0User] = TTLCache(max_size=10000)
+# M2M users by the token hash
+_m2m_tokens: TTLCache[Auth0User] = TTLCache(max_size=1000)
+__jwks_refreshed_at: float = time()
+__jwks_refresh_task: Optional[asyncio.Task] = None
 
 
 class ExtendedAuth0User(Auth0User):
@@ -138,6 +155,89 @@ def list_users(
     )
 
 
+async def _fetch_users_page(
+    page: int,
+    per_page: int,
+    fields: Optional[List[str]],
+    mgmt_token: str,
+    semaphore: asyncio.Semaphore,
+    max_retries: int,
+) -> dict:
+    params = {
+        "page": page,
+        "per_page": per_page,
+        "include_totals": "true",
+        "include_fields": "true",
+    }
+    if fields:
+        params["fields"] = ",".join(fields)
+
+    session = await get_session()
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            headers = {"Authorization": f"Bearer {mgmt_token}"}
+            async with session.get(
+                f"{AUTH_MANAGEMENT_API_URL}/users",
+                params=params,
+                headers=headers,
+            ) as response:
+                if response.status == 429 or response.status >= 500:
+                    retry_after = None
+                    reset = response.headers.get("X-RateLimit-Reset")
+                    if reset is not None:
+                        retry_after = max(0.0, float(reset) - time())
+                    if attempt == max_retries:
+                        response.raise_for_status()
+                else:
+                    response.raise_for_status()
+                    return await response.json()
+        # sleep outside the semaphore so other pages can proceed
+        backoff = retry_after if retry_after is not None else 2**attempt
+        await asyncio.sleep(backoff + random.uniform(0, 0.5))
+
+
+async def stream_users(
+    fields: Optional[List[str]],
+    per_page: int = 50,
+    concurrency: int = 5,
+    max_retries: int = 5,
+) -> AsyncIterator[dict]:
+    """
+    Yields all the users from Auth0. The first page is fetched to learn the
+    total, the remaining pages are fetched concurrently (at most `concurrency`
+    requests at a time) and yielded as soon as they arrive, so the order of
+    the users is not preserved.
+    """
+    # `get_management_token` blocks when the token has to be renewed, so it's
+    # fetched once in a thread, the token outlives the listing by far
+    mgmt_token = await run_in_threadpool(get_management_token)
+    semaphore = asyncio.Semaphore(concurrency)
+    first_page = await _fetch_users_page(
+        0, per_page, fields, mgmt_token, semaphore, max_retries
+    )
+    for user in first_page["users"]:
+        yield user
+
+    total = first_page["total"]
+    pages = (total + per_page - 1) // per_page
+    tasks = [
+        asyncio.create_task(
+            _fetch_users_page(
+                page, per_page, fields, mgmt_token, semaphore, max_retries
+            )
+        )
+        for page in range(1, pages)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            for user in result["users"]:
+                yield user
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 def enroll_user_to_mfa(user_id: str) -> str:
     mgmt_token = get_management_token()
     guardian = Guardian(domain=settings.auth_domain, token=mgmt_token)
@@ -150,6 +250,60 @@ def enroll_user_to_mfa(user_id: str) -> str:
     return response["ticket_url"]
 
 
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+async def refresh_jwks() -> None:
+    session = await get_session()
+    async with session.get(f"{AUTH_DOMAIN_FULL}.well-known/jwks.json") as response:
+        response.raise_for_status()
+        auth.jwks = await response.json()
+
+
+def _log_jwks_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"JWKS refresh failed: {task.exception()}")
+
+
+def schedule_jwks_refresh() -> None:
+    # refresh the keys in the background, so the rotated keys are already known
+    # by the time the tokens signed with them show up
+    global __jwks_refreshed_at, __jwks_refresh_task
+    if time() - __jwks_refreshed_at < JWKS_REFRESH_INTERVAL:
+        return
+    if __jwks_refresh_task is not None and not __jwks_refresh_task.done():
+        return
+    # the attempt counts as a refresh, so a failing Auth0 is retried on the next
+    # interval instead of on every request
+    __jwks_refreshed_at = time()
+    __jwks_refresh_task = asyncio.create_task(refresh_jwks())
+    __jwks_refresh_task.add_done_callback(_log_jwks_refresh_error)
+
+
+async def get_verified_user(
+    security_scopes: SecurityScopes, creds: HTTPAuthorizationCredentials
+) -> Auth0User:
+    """
+    Same as `auth.get_user`, but the verified users are cached by the token hash
+    (and the requested scopes) until the token expires.
+    """
+    schedule_jwks_refresh()
+    key = (hash_token(creds.credentials), tuple(sorted(security_scopes.scopes)))
+    user = _verified_tokens.get(key)
+    if user is not None:
+        return user
+
+    user = await auth.get_user(security_scopes, creds)
+    # the signature is verified at this point, so the claims can be trusted
+    expires_at = jwt.get_unverified_claims(creds.credentials).get("exp")
+    if expires_at is not None:
+        _verified_tokens.set(
+            key, user, min(float(expires_at), time() + VERIFIED_TOKEN_TTL)
+        )
+    return user
+
+
 def OnlyOwner(user_id: str, user: Auth0User = Security(auth.get_user)):
     if user_id != user.id:
         raise HTTPException(403)
@@ -164,7 +318,7 @@ async def OptionalAuth(
 ):
     if not creds or not creds.credentials:
         return None
-    return await auth.get_user(security_scopes, creds)
+    return await get_verified_user(security_scopes, creds)
 
 
 def AllowedPermissions(permissions: Union[str, List[str]]):
@@ -181,36 +335,51 @@ def AllowedPermissions(permissions: Union[str, List[str]]):
     return allowed_permissions_dep
 
 
+def decode_m2m_token(token: str) -> Auth0User:
+    try:
+        payload = jwt.decode(
+            token, settings.m2m_token_secret, options={"verify_aud": False}
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Expired token")
+
+    except jwt.JWTClaimsError as e:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token claims (please check issuer and audience)",
+        )
+
+    except jwt.JWTError:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Malformed token")
+
+    except Exception:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED, detail="Error decoding token"
+        )
+
+    user = Auth0User(**payload)
+    expires_at = time() + VERIFIED_TOKEN_TTL
+    if payload.get("exp") is not None:
+        expires_at = min(float(payload["exp"]), expires_at)
+    _m2m_tokens.set(hash_token(token), user, expires_at)
+    return user
+
+
 async def authenticate(
     security_scopes: SecurityScopes,
     creds: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer()),
 ):
     token = creds.credentials
+    # fast path for the M2M tokens which were already validated
+    user = _m2m_tokens.get(hash_token(token))
+    if user is not None:
+        return user
+
     unverified_claims = jwt.get_unverified_claims(token)
     if unverified_claims["iss"] == settings.m2m_token_issuer:
-        try:
-            payload = jwt.decode(
-                token, settings.m2m_token_secret, options={"verify_aud": False}
-            )
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Expired token")
-
-        except jwt.JWTClaimsError as e:
-            raise HTTPException(
-                status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token claims (please check issuer and audience)",
-            )
-
-        except jwt.JWTError:
-            raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Malformed token")
-
-        except Exception:
-            raise HTTPException(
-                status.HTTP_401_UNAUTHORIZED, detail="Error decoding token"
-            )
-        return Auth0User(**payload)
+        return decode_m2m_token(token)
     elif unverified_claims["iss"] == AUTH_DOMAIN_FULL:
-        return await auth.get_user(security_scopes, creds)
+        return await get_verified_user(security_scopes, creds)
     else:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Unknown issuer")
 
@@ -234,7 +403,7 @@ async def AnonymousUserAuth(
             permissions=[],
             anonymous=True,
         )
-    return await auth.get_user(security_scopes, creds)
+    return await get_verified_user(security_scopes, creds)
 
 
 def is_anonymous_user(user: Auth0User) -> bool:
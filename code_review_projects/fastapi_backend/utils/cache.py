@@ -1,7 +1,11 @@
-from typing import List, Optional
+from collections import OrderedDict
+from time import time
+from typing import Generic, Hashable, List, Optional, TypeVar
 
 from fastapi import Header
 
+T = TypeVar("T")
+
 
 class ETag:
     def __call__(
@@ -20,3 +24,35 @@ class ETag:
 
 def cache_headers(etag: str):
     return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+class TTLCache(Generic[T]):
+    """
+    Bounded LRU cache where every entry has its own expiration timestamp.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: T, expires_at: float) -> None:
+        if expires_at <= time():
+            return
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
@@ -1,14 +1,32 @@
+import hashlib
 from typing import Iterator
 
 from faas_services.serde import SerDesBackends
 from fastapi import Request
 
+from fastapi_backend.utils.limits import MAX_BODY_SIZE, PayloadTooLargeError
+
+
+async def process_request(
+    file_path: str, request: Request, max_body_size: int = MAX_BODY_SIZE
+) -> str:
+    """Saves the body to `file_path` and returns its SHA-256."""
+    content_length = request.headers.get("Content-Length", None)
+    if content_length and content_length.isdigit() and int(content_length) > max_body_size:
+        raise PayloadTooLargeError(f"Request body exceeds {max_body_size} bytes")
 
-async def process_request(file_path: str, request: Request):
     # stream the request body to a file, because json_stream.load() can only use sync generators
+    body_size = 0
+    body_hash = hashlib.sha256()
     with open(file_path, "wb") as f:
         async for chunk in request.stream():
+            # the header can be missing (chunked encoding) or lie, so count the bytes as well
+            body_size += len(chunk)
+            if body_size > max_body_size:
+                raise PayloadTooLargeError(f"Request body exceeds {max_body_size} bytes")
             f.write(chunk)
+            body_hash.update(chunk)
+    return body_hash.hexdigest()
 
 
 def read_body(file_path: str) -> Iterator[bytes]:
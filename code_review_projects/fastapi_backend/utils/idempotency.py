@@ -0,0 +1,65 @@
+import asyncio
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import status as http_status
+
+from fastapi_backend.utils.cache import TTLCache
+from fastapi_backend.utils.exceptions import HTTPException
+
+
+class IdempotencyKeyReusedError(HTTPException):
+    def __init__(self):
+        super(IdempotencyKeyReusedError, self).__init__(
+            status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+
+
+class IdempotencyStore:
+    """
+    Remembers the outcome of a request by its idempotency key for `ttl` seconds,
+    together with the fingerprint (hash of the body) of the request. Requests
+    with the key of a request which is still in progress wait for it instead of
+    doing the same work again, requests with a different fingerprint are rejected.
+    Failed requests are not remembered, so they can be retried.
+    """
+
+    def __init__(self, ttl: int = 3600, max_size: int = 10000):
+        self.ttl = ttl
+        self._results: TTLCache[Tuple[str, Any]] = TTLCache(max_size=max_size)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    def stored(self, key: str) -> bool:
+        """Whether the key has an outcome (the requests in progress aren't counted)."""
+        return self._results.get(key) is not None
+
+    async def run(
+        self, key: str, fingerprint: str, func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        while True:
+            stored = self._results.get(key)
+            if stored is not None:
+                stored_fingerprint, result = stored
+                if stored_fingerprint != fingerprint:
+                    raise IdempotencyKeyReusedError()
+                return result
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            in_flight_fingerprint, future = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError()
+            # `None` means the first request has failed, so try again
+            await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        result = None
+        try:
+            result = await func()
+            self._results.set(key, (fingerprint, result), time() + self.ttl)
+            return result
+        finally:
+            del self._in_flight[key]
+            future.set_result(result)
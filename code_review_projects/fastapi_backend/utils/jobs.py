@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from enum import Enum
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi_backend.utils.exceptions import HTTPException
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job:
+    def __init__(
+        self,
+        job_id: str,
+        func: Callable[[], Awaitable[Any]],
+        on_finish: Optional[Callable[[], None]] = None,
+        owner: Optional[str] = None,
+    ):
+        self.id = job_id
+        self.func = func
+        self.on_finish = on_finish
+        self.owner = owner
+        self.status = JobStatus.QUEUED
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+
+class JobQueue:
+    """
+    In-process queue served by a pool of asyncio workers. Jobs are keyed by id,
+    so submitting a job with an id which is already known returns the existing job
+    instead of running the work twice.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_retries: int = 3,
+        retry_delay: float = 1,
+        no_retry: Tuple[Type[Exception], ...] = (HTTPException, ValueError),
+        retention: int = 3600,
+    ):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.no_retry = no_retry
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+
+    def _start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    def _prune(self):
+        expire_before = time() - self.retention
+        for job_id in [
+            job.id
+            for job in self._jobs.values()
+            if job.finished and job.finished_at < expire_before
+        ]:
+            del self._jobs[job_id]
+
+    def submit(
+        self,
+        job_id: str,
+        func: Callable[[], Awaitable[Any]],
+        on_finish: Optional[Callable[[], None]] = None,
+        owner: Optional[str] = None,
+    ) -> Job:
+        self._start()
+        self._prune()
+        if job_id in self._jobs:
+            if on_finish:
+                on_finish()
+            return self._jobs[job_id]
+        job = Job(job_id, func, on_finish, owner)
+        self._jobs[job_id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        while True:
+            job.attempts += 1
+            try:
+                job.result = await job.func()
+                job.status = JobStatus.DONE
+                return
+            except Exception as e:
+                retry = (
+                    not isinstance(e, self.no_retry)
+                    and job.attempts <= self.max_retries
+                )
+                if not retry:
+                    logging.exception(f"Job {job.id} failed")
+                    job.status = JobStatus.FAILED
+                    job.error = getattr(e, "detail", None) or str(e)
+                    return
+                await asyncio.sleep(self.retry_delay * 2 ** (job.attempts - 1))
+
+    async def _worker(self):
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                job.finished_at = time()
+                if job.on_finish:
+                    job.on_finish()
+                self._queue.task_done()
+
+    async def stop(self):
+        """Waits for the queued jobs to finish and stops the workers."""
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+        self._tasks = []
@@ -0,0 +1,126 @@
+from typing import Any, Iterator, Optional
+
+from fastapi import status as http_status
+from json_stream.base import StreamingJSONBase, StreamingJSONList, StreamingJSONObject
+
+from fastapi_backend.utils.exceptions import HTTPException
+
+MAX_BODY_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_SOURCES = 1000
+MAX_CONTRACTS = 1000
+MAX_AST_DEPTH = 256
+MAX_AST_NODES = 5_000_000
+
+
+class PayloadTooLargeError(HTTPException):
+    def __init__(self, detail: str):
+        super(PayloadTooLargeError, self).__init__(
+            status_code=http_status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=detail,
+        )
+
+
+class _Counter:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.value = 0
+
+    def increment(self):
+        self.value += 1
+        if self.value > self.limit:
+            raise PayloadTooLargeError(f"{self.name} exceeds the limit of {self.limit}")
+
+
+class _GuardedStream:
+    def __init__(
+        self,
+        stream: StreamingJSONBase,
+        name: str,
+        max_items: Optional[int] = None,
+        max_depth: int = MAX_AST_DEPTH,
+        max_nodes: int = MAX_AST_NODES,
+        _depth: int = 0,
+        _nodes: Optional[_Counter] = None,
+    ):
+        if _depth > max_depth:
+            raise PayloadTooLargeError(f"{name} exceeds the depth of {max_depth}")
+        self._stream = stream
+        self._name = name
+        self._items = _Counter(name, max_items) if max_items is not None else None
+        self._max_depth = max_depth
+        self._max_nodes = max_nodes
+        self._depth = _depth
+        self._nodes = _nodes or _Counter(f"{name} size", max_nodes)
+
+    def _guard(self, value: Any) -> Any:
+        self._nodes.increment()
+        if isinstance(value, StreamingJSONBase):
+            return guarded(
+                value,
+                self._name,
+                max_depth=self._max_depth,
+                max_nodes=self._max_nodes,
+                _depth=self._depth + 1,
+                _nodes=self._nodes,
+            )
+        return value
+
+    def _count(self):
+        if self._items is not None:
+            self._items.increment()
+
+    def __getitem__(self, key):
+        return self._guard(self._stream[key])
+
+    def __getattr__(self, item):
+        return getattr(self._stream, item)
+
+
+class GuardedObject(_GuardedStream):
+    def items(self) -> Iterator[tuple[str, Any]]:
+        for key, value in self._stream.items():
+            self._count()
+            yield key, self._guard(value)
+
+    def values(self) -> Iterator[Any]:
+        for _, value in self.items():
+            yield value
+
+    def keys(self) -> Iterator[str]:
+        for key, _ in self.items():
+            yield key
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class GuardedList(_GuardedStream):
+    def __iter__(self) -> Iterator[Any]:
+        for value in self._stream:
+            self._count()
+            yield self._guard(value)
+
+
+# the guarded streams pass `isinstance` checks of `json_stream` (e.g. in `to_standard_types`)
+StreamingJSONObject.register(GuardedObject)
+StreamingJSONList.register(GuardedList)
+
+
+def guarded(stream: StreamingJSONBase, name: str, **kwargs) -> StreamingJSONBase:
+    """
+    Wraps a `json_stream` container and enforces the limits while it's being
+    consumed, so an oversized section is rejected as soon as the limit is crossed
+    instead of after the whole section has been parsed.
+    """
+    if isinstance(stream, StreamingJSONObject):
+        return GuardedObject(stream, name, **kwargs)
+    if isinstance(stream, StreamingJSONList):
+        return GuardedList(stream, name, **kwargs)
+    return stream
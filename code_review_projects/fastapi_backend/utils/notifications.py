@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+CAMPAIGN_EVENTS_CHANNEL = "campaign_events"
+
+
+def notify_campaign_event(db: Session, campaign_id: str, event: str, **data) -> None:
+    """
+    Queues a notification in the current transaction, so the subscribers
+    only get it if (and when) the transaction is committed.
+    """
+    payload = json.dumps({"campaign_id": campaign_id, "event": event, **data})
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CAMPAIGN_EVENTS_CHANNEL, "payload": payload},
+    )
+
+
+def notify_campaign_events(db: Session, events: List[dict]) -> None:
+    """Same as `notify_campaign_event`, but for many events in one statement."""
+    if not events:
+        return
+    db.execute(
+        text(
+            "SELECT pg_notify(:channel, payload) "
+            "FROM json_array_elements_text(CAST(:payloads AS json)) AS payload"
+        ),
+        {
+            "channel": CAMPAIGN_EVENTS_CHANNEL,
+            "payloads": json.dumps([json.dumps(event) for event in events]),
+        },
+    )
+
+
+class CampaignEventBroker:
+    """
+    Listens to the campaign events with a single Postgres connection per process
+    and fans them out to the subscribers of each campaign.
+    """
+
+    def __init__(self, queue_size: int = 100, poll_timeout: float = 5):
+        self.queue_size = queue_size
+        self.poll_timeout = poll_timeout
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _listen(self):
+        # imported here to avoid the circular import with the repositories
+        from fastapi_backend.repository.db import get_engine
+
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = get_engine().raw_connection()
+                # the connection is kept for the listener, so it shouldn't go back to the pool
+                connection.detach()
+                connection.set_isolation_level(0)  # autocommit, required by LISTEN
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CAMPAIGN_EVENTS_CHANNEL};")
+                pg_connection = connection.connection
+                while not self._stopped.is_set():
+                    ready, _, _ = select.select(
+                        [pg_connection], [], [], self.poll_timeout
+                    )
+                    if not ready:
+                        continue
+                    pg_connection.poll()
+                    while pg_connection.notifies:
+                        notify = pg_connection.notifies.pop(0)
+                        self._loop.call_soon_threadsafe(self._publish, notify.payload)
+            except Exception as e:
+                logging.error(e)
+                self._stopped.wait(self.poll_timeout)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _publish(self, payload: str):
+        event = json.loads(payload)
+        for queue in self._subscribers.get(event["campaign_id"], ()):
+            if queue.full():
+                # slow subscribers only need the most recent events
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def subscribe(self, campaign_id: str) -> asyncio.Queue:
+        """
+        Registers a queue which receives the events of the campaign from now on,
+        it must be released with `unsubscribe`.
+        """
+        self._start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(campaign_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, campaign_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(campaign_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[campaign_id]
+
+
+campaign_events = CampaignEventBroker()
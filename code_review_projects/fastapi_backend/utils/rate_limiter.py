@@ -0,0 +1,193 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+from time import time
+from typing import Deque, Dict, Optional
+
+from fastapi import Request, Security
+from fastapi import status as http_status
+from fastapi_auth0 import Auth0User
+from pydantic import BaseModel
+
+from fastapi_backend.utils.auth import AnonymousUserAuth, is_anonymous_user
+from fastapi_backend.utils.exceptions import HTTPException
+from fastapi_backend.utils.id import generate_uid
+
+
+class RateLimiterResult(BaseModel):
+    allowed: bool
+    remaining: int
+    retry_after: float = 0
+    ticket_id: Optional[str] = None
+    report_usage: bool = False
+
+
+class RateLimiterBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> tuple[bool, int, float]:
+        """
+        Registers a hit for the key inside a sliding window of `window` seconds,
+        unless the window is already full. Returns whether the hit was accepted,
+        the number of hits in the window and the number of seconds until the
+        oldest hit leaves the window.
+        """
+
+
+class InMemoryBackend(RateLimiterBackend):
+    def __init__(self):
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = asyncio.Lock()
+        self._swept_at = time()
+
+    def _sweep(self, now: float, window: int):
+        # the keys which aren't hit anymore would stay forever otherwise
+        for key in [key for key, hits in self._hits.items() if hits[-1] <= now - window]:
+            del self._hits[key]
+        self._swept_at = now
+
+    async def hit(self, key: str, limit: int, window: int) -> tuple[bool, int, float]:
+        now = time()
+        async with self._lock:
+            if now - self._swept_at > window:
+                self._sweep(now, window)
+            hits = self._hits.get(key) or deque()
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            allowed = len(hits) < limit
+            if allowed:
+                hits.append(now)
+            if hits:
+                self._hits[key] = hits
+            else:
+                self._hits.pop(key, None)
+            retry_after = hits[0] + window - now if hits else 0
+            return allowed, len(hits), retry_after
+
+
+class RedisBackend(RateLimiterBackend):
+    # sliding window on a sorted set, the check and the insert are done atomically
+    _script = """
+    local key = KEYS[1]
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local limit = tonumber(ARGV[3])
+    local member = ARGV[4]
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    local allowed = 0
+    if count < limit then
+        redis.call('ZADD', key, now, member)
+        count = count + 1
+        allowed = 1
+    end
+    redis.call('EXPIRE', key, math.ceil(window))
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local retry_after = 0
+    if oldest[2] then
+        retry_after = tonumber(oldest[2]) + window - now
+    end
+    return {allowed, count, tostring(retry_after)}
+    """
+
+    def __init__(self, client, prefix: str = "rate_limiter"):
+        # `client` is a `redis.asyncio.Redis` compatible client
+        self.client = client
+        self.prefix = prefix
+        self._hit = client.register_script(self._script)
+
+    async def hit(self, key: str, limit: int, window: int) -> tuple[bool, int, float]:
+        allowed, count, retry_after = await self._hit(
+            keys=[f"{self.prefix}:{key}"],
+            args=[time(), window, limit, generate_uid("hit")],
+        )
+        return bool(allowed), int(count), float(retry_after)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimiterBackend, limit: int, window: int):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+
+    async def acquire(self, key: str) -> RateLimiterResult:
+        allowed, count, retry_after = await self.backend.hit(
+            key, self.limit, self.window
+        )
+        return RateLimiterResult(
+            allowed=allowed,
+            remaining=max(self.limit - count, 0),
+            retry_after=0 if allowed else retry_after,
+        )
+
+
+# submissions per hour
+OWNER_SUBMISSIONS_LIMIT = 100
+IP_ADDRESS_SUBMISSIONS_LIMIT = 10
+SUBMISSIONS_WINDOW = 3600
+# replays of stored submissions (same `Idempotency-Key`) per hour, they aren't
+# counted as submissions, but their bodies are still read
+OWNER_REPLAYS_LIMIT = 1000
+IP_ADDRESS_REPLAYS_LIMIT = 100
+
+rate_limiter_backend: RateLimiterBackend = InMemoryBackend()
+
+
+def set_rate_limiter_backend(backend: RateLimiterBackend) -> None:
+    global rate_limiter_backend
+    rate_limiter_backend = backend
+
+
+def get_client_ip_address(request: Request) -> Optional[str]:
+    # the client controls everything in `X-Forwarded-For` but the last address,
+    # which is added by our proxy
+    forwarded_for = request.headers.get("X-Forwarded-For", None)
+    if forwarded_for:
+        return forwarded_for.split(",")[-1].strip()
+    return request.client.host if request.client else None
+
+
+async def __acquire(
+    request: Request, user: Auth0User, prefix: str, owner_limit: int, ip_limit: int
+) -> RateLimiterResult:
+    if not is_anonymous_user(user):
+        key = f"{prefix}owner:{user.id}"
+        limiter = RateLimiter(rate_limiter_backend, owner_limit, SUBMISSIONS_WINDOW)
+    else:
+        # all the anonymous submissions share the owner, so the IP address is the key
+        key = f"{prefix}ip:{get_client_ip_address(request) or 'unknown'}"
+        limiter = RateLimiter(rate_limiter_backend, ip_limit, SUBMISSIONS_WINDOW)
+
+    result = await limiter.acquire(key)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=http_status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many campaign submissions",
+            headers={"Retry-After": str(int(result.retry_after) + 1)},
+        )
+    return result
+
+
+async def SubmissionRateLimit(
+    request: Request,
+    user: Auth0User = Security(AnonymousUserAuth),
+) -> RateLimiterResult:
+    """
+    Admission control for campaign submissions. It is resolved before the
+    request body is read, so rejected submissions never hit the disk.
+    """
+    result = await __acquire(
+        request, user, "", OWNER_SUBMISSIONS_LIMIT, IP_ADDRESS_SUBMISSIONS_LIMIT
+    )
+    result.ticket_id = generate_uid("tkt")
+    result.report_usage = not is_anonymous_user(user)
+    return result
+
+
+async def SubmissionReplayRateLimit(
+    request: Request,
+    user: Auth0User = Security(AnonymousUserAuth),
+) -> RateLimiterResult:
+    """Admission control for the replays of stored submissions, before the body is read."""
+    return await __acquire(
+        request, user, "replay:", OWNER_REPLAYS_LIMIT, IP_ADDRESS_REPLAYS_LIMIT
+    )
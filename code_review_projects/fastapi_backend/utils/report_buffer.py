@@ -0,0 +1,104 @@
+import atexit
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from fastapi_backend.repository import ReportRepository
+from fastapi_backend.repository.exceptions import DBError
+from fastapi_backend.schema import ReportInput
+
+
+class ReportBuffer:
+    """
+    Coalesces the report updates: only the latest report of each campaign is kept
+    and the buffer is written with one upsert every `flush_interval` seconds, or
+    as soon as `max_size` campaigns are buffered. A report is never older than
+    `flush_interval` seconds in the DB unless the flush fails. A failed upsert is
+    retried report by report, the reports which the DB rejects (e.g. of a deleted
+    campaign) are dropped, the rest is retried on the next flush.
+    """
+
+    def __init__(self, flush_interval: float = 1, max_size: int = 500):
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._reports: Dict[str, ReportInput] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stops the periodic flushes and writes everything which is buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _merge(self, campaign_id: str, report: ReportInput):
+        buffered = self._reports.get(campaign_id)
+        # the reports can arrive out of order, the newest one wins
+        if buffered is None or buffered.issued_at <= report.issued_at:
+            self._reports[campaign_id] = report
+
+    def add(self, campaign_id: str, report: ReportInput):
+        """Buffers the report, never waits for the DB (safe to call from the event loop)."""
+        self.start()
+        with self._lock:
+            self._merge(campaign_id, report)
+            full = len(self._reports) >= self.max_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                reports, self._reports = self._reports, {}
+            if not reports:
+                return
+            try:
+                ReportRepository.save_bulk(list(reports.items()))
+                return
+            except Exception as e:
+                logging.error(e)
+            # one bad report must not keep the whole buffer from being written
+            for campaign_id, report in list(reports.items()):
+                try:
+                    ReportRepository.save(campaign_id, report)
+                except DBError as e:
+                    if not _rejected(e):
+                        # the DB is unavailable, the rest is retried on the next flush
+                        with self._lock:
+                            for campaign_id, report in reports.items():
+                                self._merge(campaign_id, report)
+                        return
+                    logging.error(f"Dropped the report of campaign {campaign_id}: {e}")
+                del reports[campaign_id]
+
+
+def _rejected(error: DBError) -> bool:
+    """Whether the DB refused the data itself, so retrying can't help."""
+    return error.orig_error is not None and isinstance(
+        error.orig_error[1], (DataError, IntegrityError)
+    )
+
+
+report_buffer = ReportBuffer()
@@ -11,6 +11,7 @@ from fastapi_backend.repository import (
     CampaignParametersRepository,
     CampaignRepository,
 )
+from fastapi_backend.repository.exceptions import UniqueConstraintViolation
 from fastapi_backend.schema import (
     Campaign,
     CampaignBase,
@@ -21,6 +22,7 @@ from fastapi_backend.schema import (
 )
 from fastapi_backend.utils.corpus import get_target_campaign_id
 from fastapi_backend.utils.exceptions import FaaSValidationError, ProjectNotFoundError
+from fastapi_backend.utils.limits import MAX_CONTRACTS, MAX_SOURCES, guarded
 from fastapi_backend.utils.project import get_default_project, get_project
 from fastapi_backend.utils.streaming import (
     CampaignProcessor,
@@ -31,6 +33,8 @@ from fastapi_backend.utils.streaming import (
     SourcesProcessor,
 )
 
+MAX_GENERATED_NAME_ATTEMPTS = 5
+
 
 @elasticapm.async_capture_span()
 async def process(
@@ -54,7 +58,9 @@ async def process(
     try:
         for key, value in stream.items():
             if key == "sources":
-                sources_processor.process(value)
+                sources_processor.process(
+                    guarded(value, "sources", max_items=MAX_SOURCES)
+                )
                 await CampaignInputsRepository.get_instance().save_campaign_sources(
                     campaign_id=campaign_id,
                     sources_json=sources_processor.sources_stream_json(),
@@ -67,7 +73,9 @@ async def process(
                     overwrite=True,
                 )
             elif key == "contracts":
-                contracts_processor.process(value)
+                contracts_processor.process(
+                    guarded(value, "contracts", max_items=MAX_CONTRACTS)
+                )
                 if contracts_processor.validation_errors:
                     raise FaaSValidationError(contracts_processor.validation_errors)
                 await CampaignInputsRepository.get_instance().save_campaign_inputs(
@@ -151,28 +159,40 @@ async def process(
             project_id = get_default_project(user_id).id
 
         campaign_name = campaign_processor.campaign_request.name
-        if not campaign_name:
-            count = CampaignRepository.count()
-            campaign_name = f"untitled_{count + 1}"
-
-        campaign = CampaignRepository.create(
-            campaign_input=CampaignBase.construct(
-                owner=user_id,
-                name=campaign_name,
-                project=project_id,
-                corpus=CampaignCorpus(target=corpus_processor.corpus_target),
-                status=CampaignStatus.IDLE,
-                submitted_at=datetime.now(),
-                num_sources=contracts_processor.num_sources,
-                instrumentation_metadata=campaign_processor.campaign_request.instrumentation_metadata,
-                map_to_original_source=campaign_processor.campaign_request.map_to_original_source,
-                quick_check=campaign_processor.campaign_request.quick_check,
-                foundry_tests=campaign_processor.campaign_request.foundry_tests,
-                foundry_tests_list=campaign_processor.campaign_request.foundry_tests_list,
-                owner_ip_address=ip_address,
-            ),
-            campaign_id=campaign_id,
-        )
+        generated_name = not campaign_name
+        for _ in range(MAX_GENERATED_NAME_ATTEMPTS):
+            if generated_name:
+                campaign_name = (
+                    f"untitled_{CampaignRepository.next_name_number(user_id)}"
+                )
+            try:
+                campaign = CampaignRepository.create(
+                    campaign_input=CampaignBase.construct(
+                        owner=user_id,
+                        name=campaign_name,
+                        project=project_id,
+                        corpus=CampaignCorpus(target=corpus_processor.corpus_target),
+                        status=CampaignStatus.IDLE,
+                        submitted_at=datetime.now(),
+                        num_sources=contracts_processor.num_sources,
+                        instrumentation_metadata=campaign_processor.campaign_request.instrumentation_metadata,
+                        map_to_original_source=campaign_processor.campaign_request.map_to_original_source,
+                        quick_check=campaign_processor.campaign_request.quick_check,
+                        foundry_tests=campaign_processor.campaign_request.foundry_tests,
+                        foundry_tests_list=campaign_processor.campaign_request.foundry_tests_list,
+                        owner_ip_address=ip_address,
+                    ),
+                    campaign_id=campaign_id,
+                )
+                break
+            except UniqueConstraintViolation:
+                # the generated name can still clash with a name given by the user
+                if not generated_name:
+                    raise
+        else:
+            raise UniqueConstraintViolation(
+                detail="Could not generate a unique campaign name", status_code=400
+            )
 
         parameters = CampaignParametersRepository.create(
             campaign_id,
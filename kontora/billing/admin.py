@@ -1,8 +1,32 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
 from billing.models import Debt
+from common.paginator import EstimatedCountPaginator
+
+
+class DebtChangeList(ChangeList):
+    def get_queryset(self, request, *args, **kwargs):
+        # only the columns of the list
+        return super().get_queryset(request, *args, **kwargs).only(
+            "amount",
+            "created_at",
+            "customer__fullname",
+            "contract__identifier",
+            "owner_customer__fullname",
+        )
 
 
 @admin.register(Debt)
 class DebtAdmin(admin.ModelAdmin):
-    ...
+    list_display = ["id", "amount", "owner_customer", "customer", "contract", "created_at"]
+    list_select_related = ["owner_customer", "customer", "contract"]
+    list_filter = ["created_at"]
+    raw_id_fields = ["customer", "contract"]
+
+    paginator = EstimatedCountPaginator
+    # the filtered pages don't count the whole table again
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return DebtChangeList
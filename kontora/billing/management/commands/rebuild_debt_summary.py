@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from billing.summary import rebuild_customer_debt_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-customer debt summaries from the debts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_customer_debt_summaries(batch_size=options["batch_size"])
+        self.stdout.write(f"Rebuilt {count} customer debt summaries.")
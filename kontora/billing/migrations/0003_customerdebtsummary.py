@@ -0,0 +1,25 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('billing', '0002_alter_debt_contract_alter_debt_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerDebtSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='debt_summary', serialize=False, to='customers.customer')),
+                ('debts_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('contract_debts_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debts_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
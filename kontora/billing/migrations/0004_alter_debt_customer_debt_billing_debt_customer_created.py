@@ -0,0 +1,24 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('billing', '0003_customerdebtsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='debt',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='debts', to='customers.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['customer', 'created_at'], name='billing_debt_customer_created'),
+        ),
+    ]
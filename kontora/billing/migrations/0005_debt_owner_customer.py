@@ -0,0 +1,20 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_email_customer_invite_sent'),
+        ('billing', '0004_alter_debt_customer_debt_billing_debt_customer_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='owner_customer',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owned_debts', to='customers.customer'),
+        ),
+    ]
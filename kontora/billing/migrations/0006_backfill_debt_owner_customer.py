@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import F, Max, OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def backfill_owner_customer(apps, schema_editor):
+    Debt = apps.get_model("billing", "Debt")
+    Contract = apps.get_model("contracts", "Contract")
+
+    contract_customer = Contract.objects.filter(pk=OuterRef("contract_id")).values("customer_id")[:1]
+    last_id = Debt.objects.aggregate(last_id=Max("pk"))["last_id"] or 0
+    # the migration isn't atomic, every batch is committed on its own and
+    # the table is never locked for the whole backfill
+    for first_id in range(0, last_id + 1, BATCH_SIZE):
+        batch = Debt.objects.filter(pk__gte=first_id, pk__lt=first_id + BATCH_SIZE, owner_customer_id__isnull=True)
+        batch.filter(customer_id__isnull=False).update(owner_customer_id=F("customer_id"))
+        batch.filter(customer_id__isnull=True, contract_id__isnull=False).update(
+            owner_customer_id=Subquery(contract_customer),
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('contracts', '0002_alter_contract_customer'),
+        ('billing', '0005_debt_owner_customer'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_owner_customer, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_backfill_debt_owner_customer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['owner_customer', 'created_at'], name='billing_debt_owner_created'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_debt_billing_debt_owner_created'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['created_at'], name='billing_debt_created_at'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+def check_debt_owners(apps, schema_editor):
+    Debt = apps.get_model("billing", "Debt")
+
+    # these debts were counted for both customers before `owner_customer`, which
+    # one owns them must be decided by hand before the constraint can be added
+    ids = list(
+        Debt.objects.filter(customer_id__isnull=False, contract_id__isnull=False).values_list("pk", flat=True)[:100]
+    )
+    if ids:
+        raise RuntimeError(
+            f"Debts with both a customer and a contract (first 100): {ids}. "
+            "Clear the customer or the contract of each of them and run the migration again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_debt_billing_debt_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_debt_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='debt',
+            constraint=models.CheckConstraint(check=models.Q(('customer__isnull', True), ('contract__isnull', True), _connector='OR'), name='billing_debt_customer_or_contract'),
+        ),
+    ]
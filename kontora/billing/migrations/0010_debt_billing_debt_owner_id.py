@@ -0,0 +1,22 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0009_debt_billing_debt_customer_or_contract'),
+    ]
+
+    operations = [
+        # the new index first, so the lookups by owner always have one
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['owner_customer', 'id'], name='billing_debt_owner_id'),
+        ),
+        migrations.RemoveIndex(
+            model_name='debt',
+            name='billing_debt_owner_created',
+        ),
+    ]
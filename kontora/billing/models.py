@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 
 
 # Provide answers
@@ -13,6 +13,7 @@ class Debt(models.Model):
         null=True,
         blank=True,
         related_name="debts",
+        db_index=False,  # covered by the (customer, created_at) index
     )
     contract = models.ForeignKey(
         "contracts.Contract",
@@ -21,10 +22,69 @@ class Debt(models.Model):
         blank=True,
         related_name="debts"
     )
+    # the customer of the debt, or the customer of its contract, set on save,
+    # so the debts of a customer are found without the join with the contracts
+    owner_customer = models.ForeignKey(
+        "customers.Customer",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="owned_debts",
+        db_index=False,  # covered by the (owner_customer, id) index
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # the lookups by customer, `contract_id` has the index of the foreign key
+            models.Index(fields=["customer", "created_at"], name="billing_debt_customer_created"),
+            # the keyset pages of the debts of a customer are ordered by the primary key
+            models.Index(fields=["owner_customer", "id"], name="billing_debt_owner_id"),
+            # the date filter of the admin
+            models.Index(fields=["created_at"], name="billing_debt_created_at"),
+        ]
+        constraints = [
+            # a debt belongs to a customer directly or through a contract, so it has
+            # exactly one owner and the per-customer totals don't count it twice
+            models.CheckConstraint(
+                check=models.Q(customer__isnull=True) | models.Q(contract__isnull=True),
+                name="billing_debt_customer_or_contract",
+            ),
+        ]
+
     def __str__(self):
-        fullname = (self.customer and self.customer.fullname) or (self.contract and self.contract.customer.fullname)
+        fullname = self.owner_customer and self.owner_customer.fullname
         return f"{fullname} ({self.amount})"
+
+    def save(self, *args, **kwargs):
+        # bulk_create() and update() skip this, they must set `owner_customer_id` themselves
+        self.owner_customer_id = self.customer_id or (self.contract and self.contract.customer_id)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "owner_customer"}
+        # the signals update `CustomerDebtSummary` in the same transaction as the debt
+        # (the deletes run in the transaction of the deletion collector already)
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(self.__class__, instance=self)):
+            super().save(*args, **kwargs)
+
+
+class CustomerDebtSummary(models.Model):
+    # maintained by the `Debt` signals (see billing/signals.py), the bulk operations
+    # bypass them, so run `manage.py rebuild_debt_summary` after those
+    customer = models.OneToOneField(
+        "customers.Customer",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="debt_summary",
+    )
+    debts_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    contract_debts_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debts_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.customer_id} ({self.debts_total} + {self.contract_debts_total})"
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from billing.models import Debt
+from billing.summary import apply_debt_delta
+from contracts.models import Contract
+
+
+def _apply(debt, sign: int, create: bool):
+    # the debts with a customer are its direct debts, the others are debts of a contract
+    if debt.customer_id is not None:
+        apply_debt_delta(debt.customer_id, debts_total=sign * debt.amount, debts_count=sign, create=create)
+    else:
+        apply_debt_delta(
+            debt.owner_customer_id, contract_debts_total=sign * debt.amount, debts_count=sign, create=create
+        )
+
+
+@receiver(pre_save, sender=Debt)
+def remember_previous_debt(sender, instance: Debt, raw=False, using=None, **kwargs):
+    instance._previous = None
+    if instance.pk is not None and not raw:
+        # locked until the end of the transaction of `Debt.save()`, so concurrent
+        # updates of the debt don't subtract the same previous amount twice
+        instance._previous = (
+            Debt.objects.using(using)
+            .select_for_update()
+            .filter(pk=instance.pk)
+            .only("amount", "customer_id", "owner_customer_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Debt)
+def update_summary_on_save(sender, instance: Debt, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous", None)
+    if previous is not None:
+        _apply(previous, -1, create=False)
+    _apply(instance, 1, create=True)
+
+
+@receiver(post_delete, sender=Debt)
+def update_summary_on_delete(sender, instance: Debt, **kwargs):
+    # no rows are created here: when a customer is deleted its summary may be
+    # already deleted by the cascade
+    _apply(instance, -1, create=False)
+
+
+@receiver(pre_save, sender=Contract)
+def remember_previous_contract_customer(sender, instance: Contract, raw=False, using=None, **kwargs):
+    instance._previous_customer_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_customer_id = (
+            Contract.objects.using(using).filter(pk=instance.pk).values_list("customer_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Contract)
+def move_contract_debts(sender, instance: Contract, created=False, raw=False, using=None, **kwargs):
+    # the debts of a contract belong to the customer of the contract, `update()`
+    # skips the `Debt` signals, so their summaries are moved here as well
+    previous_customer_id = getattr(instance, "_previous_customer_id", None)
+    if created or raw or previous_customer_id in (None, instance.customer_id):
+        return
+
+    with transaction.atomic(using=using):
+        debts = Debt.objects.using(using).filter(contract=instance).exclude(owner_customer_id=instance.customer_id)
+        moved = defaultdict(lambda: [Decimal(0), 0])
+        for owner_customer_id, amount in debts.select_for_update().values_list("owner_customer_id", "amount"):
+            moved[owner_customer_id][0] += amount
+            moved[owner_customer_id][1] += 1
+        if not moved:
+            return
+
+        debts.update(owner_customer_id=instance.customer_id)
+        for owner_customer_id, (total, count) in moved.items():
+            apply_debt_delta(owner_customer_id, contract_debts_total=-total, debts_count=-count, create=False)
+        apply_debt_delta(
+            instance.customer_id,
+            contract_debts_total=sum(total for total, _ in moved.values()),
+            debts_count=sum(count for _, count in moved.values()),
+        )
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from billing.models import CustomerDebtSummary, Debt
+from customers.models import Customer
+
+
+def apply_debt_delta(customer_id: int | None, *, debts_total=0, contract_debts_total=0, debts_count=0, create=True):
+    if customer_id is None:
+        return
+    changes = {
+        "debts_total": F("debts_total") + debts_total,
+        "contract_debts_total": F("contract_debts_total") + contract_debts_total,
+        "debts_count": F("debts_count") + debts_count,
+        "updated_at": timezone.now(),
+    }
+    updated = CustomerDebtSummary.objects.filter(customer_id=customer_id).update(**changes)
+    if not updated and create:
+        # the first debt of the customer, the row is created and then updated with
+        # F() expressions as well, so concurrent writers don't overwrite each other
+        CustomerDebtSummary.objects.get_or_create(customer_id=customer_id)
+        CustomerDebtSummary.objects.filter(customer_id=customer_id).update(**changes)
+
+
+def _lock_debts():
+    # the debts can still be read, but not written until the end of the transaction,
+    # so no delta is applied between the aggregation and the new rows (SQLite has
+    # a single writer, the delete of the summaries below takes its write lock)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {connection.ops.quote_name(Debt._meta.db_table)} IN SHARE MODE")
+
+
+def rebuild_customer_debt_summaries(batch_size: int = 1000) -> int:
+    """Recomputes the summaries of all the customers, returns the number of rows."""
+    with transaction.atomic():
+        _lock_debts()
+        CustomerDebtSummary.objects.all().delete()
+
+        totals = defaultdict(lambda: {"debts_total": Decimal(0), "contract_debts_total": Decimal(0), "debts_count": 0})
+
+        direct = (
+            Debt.objects.filter(customer_id__isnull=False)
+            .values("customer_id")
+            .annotate(total=Sum("amount"), count=Count("pk"))
+            .values_list("customer_id", "total", "count")
+        )
+        for customer_id, total, count in direct:
+            totals[customer_id]["debts_total"] = total
+            totals[customer_id]["debts_count"] += count
+
+        by_contract = (
+            Debt.objects.filter(customer_id__isnull=True, owner_customer_id__isnull=False)
+            .values("owner_customer_id")
+            .annotate(total=Sum("amount"), count=Count("pk"))
+            .values_list("owner_customer_id", "total", "count")
+        )
+        for customer_id, total, count in by_contract:
+            totals[customer_id]["contract_debts_total"] = total
+            totals[customer_id]["debts_count"] += count
+
+        CustomerDebtSummary.objects.bulk_create(
+            (
+                CustomerDebtSummary(customer_id=customer_id, **totals.get(customer_id, {}))
+                for customer_id in Customer.objects.values_list("pk", flat=True).iterator()
+            ),
+            batch_size=batch_size,
+        )
+    return CustomerDebtSummary.objects.count()
@@ -1,5 +1,9 @@
+from itertools import islice
+from smtplib import SMTPException
+
 from celery import current_app
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mass_mail
+from django.db import transaction
 
 from customers.models import Customer
 
@@ -7,17 +11,44 @@ from customers.models import Customer
 # Comment on every task
 # - Is there any problem?
 
+STATEMENTS_CHUNK_SIZE = 1000  # customers per sub-task
+STATEMENTS_BATCH_SIZE = 100  # customers per transaction of a sub-task
+
+
 @current_app.task()
 def send_monthly_account_statements():
-    customers = Customer.objects.filter(invite_sent=False)
-
-    for customer in customers:
-        send_mail(
-            subject="Monthly Account Statement",
-            message="Bla bla bla bla.",
-            from_email="from@kontora.com",
-            recipient_list=[customer.email],
-            fail_silently=False,
-        )
-
-    customers.update(invite_sent=True)
+    # only the ids are read here, the customers are sent in chunks by the sub-tasks,
+    # which skip everyone already marked, so the task can be restarted any time
+    customer_ids = (
+        Customer.objects.filter(invite_sent=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=STATEMENTS_CHUNK_SIZE)
+    )
+    while chunk := list(islice(customer_ids, STATEMENTS_CHUNK_SIZE)):
+        send_account_statements.delay(chunk)
+
+
+@current_app.task(autoretry_for=(SMTPException,), retry_backoff=True, max_retries=5)
+def send_account_statements(customer_ids: list[int]):
+    ids = iter(customer_ids)
+    # one SMTP connection for the whole chunk
+    with get_connection(fail_silently=False) as connection:
+        while batch := list(islice(ids, STATEMENTS_BATCH_SIZE)):
+            with transaction.atomic():
+                # the locked customers are being sent by a concurrent run of the task
+                customers = list(
+                    Customer.objects.select_for_update(skip_locked=True)
+                    .filter(pk__in=batch, invite_sent=False)
+                    .only("pk", "email")
+                )
+                send_mass_mail(
+                    [
+                        ("Monthly Account Statement", "Bla bla bla bla.", "from@kontora.com", [customer.email])
+                        for customer in customers
+                    ],
+                    fail_silently=False,
+                    connection=connection,
+                )
+                # the batch is marked in the same transaction, a failure rolls it back to be retried
+                Customer.objects.filter(pk__in=[customer.pk for customer in customers]).update(invite_sent=True)
@@ -0,0 +1,257 @@
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from billing.admin import DebtAdmin
+from billing.models import CustomerDebtSummary, Debt
+from billing.summary import rebuild_customer_debt_summaries
+from billing.views import _total
+from contracts.models import Contract
+from customers.models import Customer
+
+
+def _per_customer_loop() -> list[dict]:
+    # the original implementation of the view, 1 + 2N + M queries
+    return [
+        {
+            "customer_id": customer.pk,
+            "debts_total": sum(customer.debts.values_list("amount", flat=True)),
+            "contract_debts_total": sum(
+                sum(c.debts.values_list("amount", flat=True)) for c in customer.contracts.all()
+            ),
+        }
+        for customer in Customer.objects.all()
+    ]
+
+
+class ListDebtPerCustomerTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # a customer with both kinds of debts, one with contract debts only, one without debts
+        both, contracts_only, _ = Customer.objects.bulk_create(
+            Customer(fullname=f"John Doe {i}", email=f"john.doe.{i}@example.com") for i in range(3)
+        )
+        Debt.objects.create(customer=both, amount=Decimal("10.50"))
+        Debt.objects.create(customer=both, amount=Decimal("0.25"))
+        for customer in (both, contracts_only):
+            for amount in (Decimal("1.10"), Decimal("2.20")):
+                contract = Contract.objects.create(customer=customer)
+                Debt.objects.create(contract=contract, amount=amount)
+                Debt.objects.create(contract=contract, amount=amount)
+        Contract.objects.create(customer=contracts_only)
+
+    def test_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("billing:list_debt_per_customer_total"))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_same_output_as_per_customer_loop(self):
+        # a debt of one customer on the contract of another one was counted for both
+        # of them by the loop, it can't be created anymore
+        customer = Customer.objects.first()
+        contract = Contract.objects.exclude(customer=customer).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Debt.objects.create(customer=customer, contract=contract, amount=Decimal("1.00"))
+
+        response = self.client.get(reverse("billing:list_debt_per_customer_total"))
+
+        expected = json.loads(JsonResponse(_per_customer_loop(), safe=False).content)
+        self.assertEqual(response.json(), expected)
+
+
+class ListResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer, other = Customer.objects.bulk_create(
+            Customer(fullname=f"John Doe {i}", email=f"john.doe.{i}@example.com") for i in range(2)
+        )
+        contract = Contract.objects.create(customer=cls.customer)
+        for amount in range(1, 5):
+            Debt.objects.create(customer=cls.customer, amount=amount)
+            Debt.objects.create(contract=contract, amount=amount)
+            Debt.objects.create(customer=other, amount=amount)
+        cls.urls = [
+            reverse("billing:list_debt_per_customer_total"),
+            reverse("billing:debt_report"),
+            reverse("billing:get_debts_by_customer_id", args=[cls.customer.pk]),
+        ]
+
+    def test_pages_add_up_to_the_whole_list(self):
+        url = reverse("billing:get_debts_by_customer_id", args=[self.customer.pk])
+        rows, after = [], 0
+        while after is not None:
+            page = self.client.get(url, {"limit": 3, "after": after}).json()
+            self.assertLessEqual(len(page["results"]), 3)
+            rows += page["results"]
+            after = page["next"]
+
+        self.assertEqual(rows, self.client.get(url).json())
+        self.assertEqual(len(rows), 8)
+        self.assertEqual([row["debt_id"] for row in rows], sorted(row["debt_id"] for row in rows))
+
+    def test_after_skips_up_to_the_cursor(self):
+        url = reverse("billing:get_debts_by_customer_id", args=[self.customer.pk])
+        first = self.client.get(url, {"limit": 3}).json()
+        second = self.client.get(url, {"limit": 3, "after": first["next"]}).json()
+
+        self.assertEqual(first["next"], first["results"][-1]["debt_id"])
+        self.assertTrue(all(row["debt_id"] > first["next"] for row in second["results"]))
+
+    def test_last_page_has_no_cursor(self):
+        url = reverse("billing:list_debt_per_customer_total")
+        self.assertIsNone(self.client.get(url, {"limit": 2}).json()["next"])
+        self.assertIsNotNone(self.client.get(url, {"limit": 1}).json()["next"])
+
+    def test_invalid_parameters(self):
+        for params in ({"limit": "x"}, {"after": "x"}, {"limit": 0}, {"limit": -1}):
+            for url in self.urls:
+                with self.subTest(url=url, params=params):
+                    self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_stream_is_the_same_as_the_whole_list(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                streamed = self.client.get(url, {"stream": 1})
+
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(b"".join(streamed.streaming_content), self.client.get(url).content)
+
+    def test_stream_of_an_empty_list(self):
+        url = reverse("billing:get_debts_by_customer_id", args=[0])
+        streamed = self.client.get(url, {"stream": 1})
+
+        self.assertEqual(b"".join(streamed.streaming_content), self.client.get(url).content)
+
+
+def _summaries() -> dict[int, tuple]:
+    return {
+        customer_id: (_total(debts_total), _total(contract_debts_total), debts_count)
+        for customer_id, debts_total, contract_debts_total, debts_count in CustomerDebtSummary.objects.values_list(
+            "customer_id", "debts_total", "contract_debts_total", "debts_count"
+        )
+    }
+
+
+class DebtSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second, cls.third = Customer.objects.bulk_create(
+            Customer(fullname=f"John Doe {i}", email=f"john.doe.{i}@example.com") for i in range(3)
+        )
+        cls.contract = Contract.objects.create(customer=cls.first)
+        rebuild_customer_debt_summaries()
+
+    def assertSummariesRebuilt(self):
+        summaries = _summaries()
+        rebuild_customer_debt_summaries()
+        self.assertEqual(summaries, _summaries())
+
+    def test_signals_keep_summaries_equal_to_rebuild(self):
+        debt = Debt.objects.create(customer=self.first, amount=Decimal("10.50"))
+        contract_debt = Debt.objects.create(contract=self.contract, amount=Decimal("2.25"))
+        Debt.objects.create(contract=self.contract, amount=Decimal("1.00"))
+        self.assertSummariesRebuilt()
+        self.assertEqual(_summaries()[self.first.pk], (Decimal("10.50"), Decimal("3.25"), 3))
+
+        with self.subTest("update the amount"):
+            debt.amount = Decimal("7.00")
+            debt.save()
+            self.assertSummariesRebuilt()
+
+        with self.subTest("move the debt to another customer"):
+            debt.customer = self.second
+            debt.save()
+            self.assertSummariesRebuilt()
+
+        with self.subTest("move the debt to a contract"):
+            debt.customer = None
+            debt.contract = self.contract
+            debt.save()
+            self.assertSummariesRebuilt()
+
+        with self.subTest("move the contract debt to a customer"):
+            contract_debt.contract = None
+            contract_debt.customer = self.third
+            contract_debt.save()
+            self.assertSummariesRebuilt()
+
+        with self.subTest("move the contract to another customer"):
+            self.contract.customer = self.second
+            self.contract.save()
+            self.assertSummariesRebuilt()
+            self.assertEqual(_summaries()[self.first.pk], (Decimal("0.00"), Decimal("0.00"), 0))
+
+        with self.subTest("delete a debt"):
+            contract_debt.delete()
+            self.assertSummariesRebuilt()
+
+        with self.subTest("delete the contract with its debts"):
+            self.contract.delete()
+            self.assertSummariesRebuilt()
+
+    def test_debt_report(self):
+        Debt.objects.create(customer=self.first, amount=Decimal("10.50"))
+        Debt.objects.create(contract=self.contract, amount=Decimal("2.25"))
+
+        response = self.client.get(reverse("billing:debt_report"))
+
+        self.assertEqual(
+            [
+                (row["customer_id"], row["debts_total"], row["contract_debts_total"], row["debts_count"])
+                for row in response.json()
+            ],
+            [
+                (self.first.pk, "10.50", "2.25", 2),
+                (self.second.pk, "0.00", "0.00", 0),
+                (self.third.pk, "0.00", "0.00", 0),
+            ],
+        )
+
+    def test_rebuild_command(self):
+        Debt.objects.create(customer=self.first, amount=Decimal("10.50"))
+        Debt.objects.create(contract=self.contract, amount=Decimal("2.25"))
+        expected = _summaries()
+        # e.g. after a bulk operation which skips the signals
+        CustomerDebtSummary.objects.all().delete()
+
+        stdout = StringIO()
+        call_command("rebuild_debt_summary", stdout=stdout)
+
+        self.assertEqual(_summaries(), expected)
+        self.assertIn("Rebuilt 3 customer debt summaries.", stdout.getvalue())
+
+
+class DebtAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        customers = Customer.objects.bulk_create(
+            Customer(fullname=f"John Doe {i}", email=f"john.doe.{i}@example.com") for i in range(5)
+        )
+        for customer in customers:
+            contract = Contract.objects.create(customer=customer)
+            for amount in range(1, 11):
+                Debt.objects.create(customer=customer, amount=amount)
+                Debt.objects.create(contract=contract, amount=amount)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_changelist_query_count_is_independent_of_page_size(self):
+        # the session, the user, the count and the page with the related rows
+        for page_size in (10, 50, 100):
+            with self.subTest(page_size=page_size), mock.patch.object(DebtAdmin, "list_per_page", page_size):
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse("admin:billing_debt_changelist"))
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context["cl"].result_list), page_size)
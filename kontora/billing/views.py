@@ -1,7 +1,12 @@
-from django.db.models import Q
-from django.http import JsonResponse
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, QuerySet, Subquery, Sum
+from django.http import JsonResponse, StreamingHttpResponse
 
 from billing.models import Debt
+from config.routers import use_replica
 from customers.models import Customer
 
 
@@ -9,47 +14,155 @@ from customers.models import Customer
 # - Is there any problem?
 # - What are the limitation of each view?
 
+CENTS = Decimal("0.01")
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+
+def _total(amount: Decimal | None) -> Decimal | int:
+    # the same as `sum()` of the amounts: 0 without debts, otherwise 2 decimal places
+    # (SQLite returns sums of decimals without the trailing zeros)
+    if amount is None:
+        return 0
+    return amount.quantize(CENTS)
+
+
+def _stream_json_list(rows: Iterable[dict]) -> Iterator[str]:
+    # the same output as `JsonResponse(result, safe=False)`, but built row by row
+    encoder = DjangoJSONEncoder()
+    separator = "["
+    for row in rows:
+        yield separator + encoder.encode(row)
+        separator = ", "
+    yield "[]" if separator == "[" else "]"
+
+
+def _after(queryset: QuerySet, after: int | None) -> QuerySet:
+    return queryset if after is None else queryset.filter(pk__gt=after)
+
+
+def _list_response(request, rows: Callable[[int | None], QuerySet], to_row: Callable[[tuple], dict]):
+    """
+    Renders `rows(after)` (`values_list()` rows with the primary key first, only the
+    ones after the `after` key if it isn't `None`):
+    - `?limit=N[&after=<pk>]` - a keyset-paginated page with the cursor of the next page
+    - `?stream=1` - a streamed list, the rows are read from the DB in chunks
+    - otherwise - the whole list
+    """
+    if "limit" in request.GET or "after" in request.GET:
+        try:
+            limit = min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+            after = int(request.GET.get("after", 0))
+        except ValueError:
+            return JsonResponse({"error": "limit and after must be integers"}, status=400)
+        if limit < 1:
+            return JsonResponse({"error": "limit must be positive"}, status=400)
+        page = list(rows(after).order_by("pk")[: limit + 1])
+        return JsonResponse({
+            "results": [to_row(row) for row in page[:limit]],
+            "next": page[limit - 1][0] if len(page) > limit else None,
+        })
+
+    if request.GET.get("stream"):
+        queryset = rows(None)
+        # the rows are read after the view has returned, so the database is chosen now
+        queryset = queryset.using(queryset.db)
+        return StreamingHttpResponse(
+            _stream_json_list(to_row(row) for row in queryset.iterator(chunk_size=STREAM_BATCH_SIZE)),
+            content_type="application/json",
+        )
+
+    return JsonResponse([to_row(row) for row in rows(None)], safe=False)
+
 
+def _customer_totals(after: int | None = None) -> QuerySet:
+    # one query: the totals are correlated subqueries on the indexed customer columns
+    debts_total = (
+        Debt.objects.filter(customer_id=OuterRef("pk"))
+        .values("customer_id")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    contract_debts_total = (
+        Debt.objects.filter(owner_customer_id=OuterRef("pk"), customer_id__isnull=True)
+        .values("owner_customer_id")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return _after(Customer.objects.all(), after).annotate(
+        debts_total=Subquery(debts_total),
+        contract_debts_total=Subquery(contract_debts_total),
+    ).values_list("pk", "debts_total", "contract_debts_total")
+
+
+def _customer_total_row(row) -> dict:
+    customer_id, debts_total, contract_debts_total = row
+    return {
+        "customer_id": customer_id,
+        "debts_total": _total(debts_total),
+        "contract_debts_total": _total(contract_debts_total),
+    }
+
+
+@use_replica
 def list_debt_per_customer_total(request):
-    customers = Customer.objects.all()
+    return _list_response(request, _customer_totals, _customer_total_row)
 
-    result = []
-    for customer in customers:
-        data = {
-            "customer_id": customer.pk,
-            "debts_total": sum(customer.debts.values_list("amount", flat=True)),
-            "contract_debts_total": sum(sum(c.debts.values_list("amount", flat=True)) for c in customer.contracts.all())
-        }
-        result.append(data)
 
-    return JsonResponse(result, safe=False)
+def _debt_report_row(row) -> dict:
+    customer_id, debts_total, contract_debts_total, debts_count, updated_at = row
+    return {
+        "customer_id": customer_id,
+        "debts_total": _total(debts_total),
+        "contract_debts_total": _total(contract_debts_total),
+        "debts_count": debts_count or 0,
+        "updated_at": updated_at,
+    }
+
+
+@use_replica
+def debt_report(request):
+    # reads the precomputed summaries, so it's one row per customer whatever the number of debts
+    def customers(after: int | None) -> QuerySet:
+        return _after(Customer.objects.all(), after).values_list(
+            "pk",
+            "debt_summary__debts_total",
+            "debt_summary__contract_debts_total",
+            "debt_summary__debts_count",
+            "debt_summary__updated_at",
+        )
+
+    return _list_response(request, customers, _debt_report_row)
 
 
 def get_total_debt_by_customer_id(request, customer_id: int):
     customer = Customer.objects.get(pk=customer_id)
 
-    total = sum(customer.debts.values_list("amount", flat=True))
-    total += sum(sum(c.debts.values_list("amount", flat=True)) for c in customer.contracts.all())
+    total = Debt.objects.filter(owner_customer_id=customer.pk).aggregate(total=Sum("amount"))["total"]
     return JsonResponse({
         "customer_id": customer.pk,
-        "total": total,
+        "total": _total(total),
     })
 
 
 def get_debts_by_customer_id(request, customer_id: int):
-    debts = Debt.objects.filter(
-        Q(customer_id=customer_id) | Q(contract__customer_id=customer_id),
-    )
+    # one index lookup, the owner covers both the debts of the customer and of its contracts
+    def debts(after: int | None) -> QuerySet:
+        return _after(Debt.objects.filter(owner_customer_id=customer_id), after).values_list(
+            "pk", "amount", "contract_id", "created_at"
+        )
+
+    return _list_response(request, debts, _debt_row)
+
 
-    result = []
-    for debt in debts:
-        data = {
-            "debt_id": debt.pk,
-            "amount": float(debt.amount),
-            "contract_id": debt.contract_id,
-            "created_at": str(debt.created_at),
-            "updated_at": str(debt.created_at),
-        }
-        result.append(data)
-
-    return JsonResponse(result, safe=False)
+def _debt_row(row) -> dict:
+    debt_id, amount, contract_id, created_at = row
+    return {
+        "debt_id": debt_id,
+        "amount": float(amount),
+        "contract_id": contract_id,
+        "created_at": str(created_at),
+        "updated_at": str(created_at),
+    }
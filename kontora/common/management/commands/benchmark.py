@@ -0,0 +1,121 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management import BaseCommand, call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.models import Debt
+from contracts.models import Contract
+from customers.models import Customer
+
+
+def percentile(ordered: list[float], p: int) -> float:
+    # nearest-rank percentile of sorted values
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Measure the billing endpoints and print the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-customers", type=int, default=0, help="Create fake data for this many customers first.")
+        parser.add_argument("--iterations", type=int, default=20, help="Requests per endpoint and customer.")
+        parser.add_argument("--warmup", type=int, default=2, help="Requests per endpoint which aren't measured.")
+        parser.add_argument("--sample", type=int, default=5, help="Number of customers for the per-customer endpoints.")
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["seed_customers"]:
+            call_command("fakedata", customers=options["seed_customers"])
+
+        customer_ids = list(Customer.objects.values_list("pk", flat=True))
+        if not customer_ids:
+            self.stderr.write("There are no customers, run with --seed-customers.")
+            return
+        sample = random.Random(options["random_seed"]).sample(customer_ids, min(options["sample"], len(customer_ids)))
+
+        endpoints = {
+            "list_debt_per_customer_total": [reverse("billing:list_debt_per_customer_total")],
+            "debt_report": [reverse("billing:debt_report")],
+            "get_total_debt_by_customer_id": [
+                reverse("billing:get_total_debt_by_customer_id", args=[customer_id]) for customer_id in sample
+            ],
+            "get_debts_by_customer_id": [
+                reverse("billing:get_debts_by_customer_id", args=[customer_id]) for customer_id in sample
+            ],
+        }
+
+        client = Client()
+        result = {
+            "database": connection.vendor,
+            "customers": len(customer_ids),
+            "contracts": Contract.objects.count(),
+            "debts": Debt.objects.count(),
+            "iterations": options["iterations"],
+            "endpoints": {
+                name: self.measure(client, urls, options["iterations"], options["warmup"])
+                for name, urls in endpoints.items()
+            },
+        }
+
+        output = json.dumps(result, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def measure(self, client: Client, urls: list[str], iterations: int, warmup: int) -> dict:
+        for url in urls[:1] * warmup:
+            self.get(client, url)
+
+        latencies = []
+        for url in urls:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                self.get(client, url)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        # queries and memory are measured separately, the tracing slows the requests down
+        queries = []
+        peak_memory = []
+        for url in urls:
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as captured:
+                self.get(client, url)
+            peak_memory.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            queries.append(len(captured))
+
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "latency_ms": {
+                "min": round(min(latencies), 3),
+                "mean": round(statistics.fmean(latencies), 3),
+                "p50": round(percentile(latencies, 50), 3),
+                "p90": round(percentile(latencies, 90), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+                "max": round(max(latencies), 3),
+            },
+            "queries": max(queries),
+            "peak_memory_bytes": max(peak_memory),
+        }
+
+    def get(self, client: Client, url: str):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        # streamed responses are only done when they are consumed
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
@@ -1,46 +1,155 @@
-from itertools import cycle
-from random import randrange
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from random import Random
 
+import django
 from django.core.management import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
 
 from billing.models import Debt
+from billing.summary import rebuild_customer_debt_summaries
 from contracts.models import Contract
 from customers.models import Customer
 
 
-class Command(BaseCommand):
-    help = "Create fake data for the development environment."
+def _next_id(model) -> int:
+    return (model.objects.aggregate(max_id=Max("pk"))["max_id"] or 0) + 1
 
-    number_of_customers = 100
-    number_of_debts_per_customer = 6
 
-    number_of_contracts_per_customer = 100
-    number_of_debts_per_contract = 3
+def _insert(model, objects, batch_size: int) -> int:
+    # bulk_create() makes a list of everything it gets, so the objects are passed in batches
+    count = 0
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+    return count
 
-    def handle(self, *args, **options):
-        def amount_generator():
-            while True:
-                yield randrange(1, 500)
 
-        amount = amount_generator()
+def _init_worker():
+    django.setup()
+    connections.close_all()
 
-        Customer.objects.bulk_create((Customer(fullname=f"John Doe {i}") for i in range(self.number_of_customers)))
-        customers = Customer.objects.all()
-        infinity_customers = cycle(customers)
 
-        Debt.objects.bulk_create(
-            (Debt(customer=next(infinity_customers), amount=next(amount)) for _ in range(self.number_of_customers * self.number_of_debts_per_customer))
-        )
+def create_customers(first: int, last: int, layout: dict) -> int:
+    """
+    Creates the customers with the indexes `first`..`last - 1` with their contracts
+    and debts. All the ids are derived from the indexes, so nothing is read back
+    from the DB and the workers never insert the same ids.
+    """
+    customer_id = layout["customer_id"]
+    contracts = layout["contracts"]
+    batch_size = layout["batch_size"]
+    debts_per_customer = layout["debts"] + contracts * layout["contract_debts"]
+
+    amount = Random(f"{layout['seed']}-{first}")
+
+    _insert(
+        Customer,
+        (
+            Customer(id=customer_id + i, fullname=f"John Doe {customer_id + i}", email=f"john.doe.{customer_id + i}@example.com")
+            for i in range(first, last)
+        ),
+        batch_size,
+    )
+    _insert(
+        Contract,
+        (
+            Contract(id=layout["contract_id"] + i * contracts + j, customer_id=customer_id + i)
+            for i in range(first, last)
+            for j in range(contracts)
+        ),
+        batch_size,
+    )
+    return _insert(
+        Debt,
+        (
+            debt
+            for i in range(first, last)
+            for debt in _customer_debts(i, layout, debts_per_customer, amount)
+        ),
+        batch_size,
+    )
 
-        Contract.objects.bulk_create(
-            (Contract(customer=next(infinity_customers)) for _ in range(self.number_of_customers * self.number_of_contracts_per_customer))
+
+def _customer_debts(i: int, layout: dict, debts_per_customer: int, amount: Random):
+    first_id = layout["debt_id"] + i * debts_per_customer
+    for j in range(layout["debts"]):
+        yield Debt(
+            id=first_id + j,
+            customer_id=layout["customer_id"] + i,
+            owner_customer_id=layout["customer_id"] + i,
+            amount=amount.randrange(1, 500),
         )
-        contracts = Contract.objects.all()
-        infinity_contracts = cycle(contracts)
 
-        Debt.objects.bulk_create(
-            (
-                Debt(contract=next(infinity_contracts), amount=next(amount))
-                for _ in range(self.number_of_customers * self.number_of_contracts_per_customer * self.number_of_debts_per_contract)
+    first_id += layout["debts"]
+    for j in range(layout["contracts"]):
+        contract_id = layout["contract_id"] + i * layout["contracts"] + j
+        for k in range(layout["contract_debts"]):
+            yield Debt(
+                id=first_id + j * layout["contract_debts"] + k,
+                contract_id=contract_id,
+                owner_customer_id=layout["customer_id"] + i,
+                amount=amount.randrange(1, 500),
             )
+
+
+class Command(BaseCommand):
+    help = "Create fake data for the development environment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=100, help="Number of customers.")
+        parser.add_argument("--contracts", type=int, default=100, help="Contracts per customer.")
+        parser.add_argument("--debts", type=int, default=6, help="Debts per customer.")
+        parser.add_argument("--contract-debts", type=int, default=3, help="Debts per contract.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT.")
+        parser.add_argument(
+            "--workers", type=int, default=1, help="Processes which insert the data (SQLite always uses one)."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the random amounts.")
+
+    def handle(self, *args, **options):
+        customers = options["customers"]
+        workers = options["workers"]
+        if connection.vendor == "sqlite" and workers > 1:
+            self.stderr.write("SQLite doesn't allow concurrent writers, using one worker.")
+            workers = 1
+
+        layout = {
+            "customer_id": _next_id(Customer),
+            "contract_id": _next_id(Contract),
+            "debt_id": _next_id(Debt),
+            "contracts": options["contracts"],
+            "debts": options["debts"],
+            "contract_debts": options["contract_debts"],
+            "batch_size": options["batch_size"],
+            "seed": options["seed"],
+        }
+
+        # small chunks of customers, so the workers are busy until the end
+        chunk = max(1, min(customers // (workers * 4), 1000))
+        chunks = [(first, min(first + chunk, customers)) for first in range(0, customers, chunk)]
+
+        start = time.perf_counter()
+        if workers == 1:
+            debts = sum(create_customers(first, last, layout) for first, last in chunks)
+        else:
+            # the forked workers must not share the connection of this process
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                debts = sum(executor.map(create_customers, *zip(*chunks), [layout] * len(chunks)))
+
+        # the ids were set explicitly, so the sequences don't know about them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Customer, Contract, Debt]):
+                cursor.execute(sql)
+
+        # bulk_create() doesn't send the signals which maintain the summaries
+        rebuild_customer_debt_summaries()
+
+        self.stdout.write(
+            f"Created {customers} customers, {customers * options['contracts']} contracts "
+            f"and {debts} debts in {time.perf_counter() - start:.1f}s."
         )
@@ -0,0 +1,24 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the row estimate of Postgres instead of `COUNT(*)` for the unfiltered
+    big tables, the exact count of millions of rows takes seconds.
+    """
+
+    exact_count_limit = 100000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        if connection.vendor == "postgresql" and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [query.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > self.exact_count_limit:
+                return row[0]
+        return super().count
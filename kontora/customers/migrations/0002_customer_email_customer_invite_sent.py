@@ -0,0 +1,24 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='email',
+            field=models.EmailField(default='', max_length=256),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='invite_sent',
+            field=models.BooleanField(default=False),
+        ),
+    ]